@@ -0,0 +1,99 @@
+"""
+Memory benchmark for the node classes.
+
+Reports how many bytes a single TextNode / LeafNode / ParentNode costs and the
+tracemalloc peak for parsing and serializing a large generated document.
+
+    python3 bench/bench_memory.py [--paragraphs N] [--json out.json]
+"""
+import argparse, json, os, sys, tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from textnode import *
+
+
+NODE_COUNT = 100_000
+
+
+def bytes_per_node(factory, count=NODE_COUNT):
+    # allocate a batch of nodes and divide what tracemalloc saw by how many there are
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(index) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return (after - before) / count
+
+
+def large_document(paragraphs):
+    # every paragraph has the usual mix of inline markup plus a link and an image
+    # that repeat all over the page, like nav links and icons do on real pages
+    blocks = ["# Benchmark page"]
+    for index in range(paragraphs):
+        blocks.append(
+            f"Paragraph {index} has **bold**, _italic_ and `code` text, a [link](/blog/tom) "
+            f"and an ![icon](/images/tom.png) plus a [unique link](/page/{index})."
+        )
+        if index % 10 == 0:
+            blocks.append("- first item\n- second **item**\n- third [item](/blog/tom)")
+    return "\n\n".join(blocks)
+
+
+def peak_memory(function, *args):
+    tracemalloc.start()
+    result = function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak
+
+
+def count_nodes(node):
+    total = 1
+    for child in node.children or []:
+        total += count_nodes(child)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--paragraphs", type=int, default=20_000)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {
+        "bytes_per_node": {
+            "TextNode": bytes_per_node(lambda index: TextNode("text", TextType.TEXT)),
+            "LeafNode": bytes_per_node(lambda index: LeafNode("b", "text")),
+            "LeafNode(link)": bytes_per_node(lambda index: text_node_to_html_node(
+                TextNode("link", TextType.LINK, "/blog/tom"))),
+            "ParentNode": bytes_per_node(lambda index: ParentNode("p", None)),
+        },
+    }
+
+    markdown = large_document(args.paragraphs)
+    node, parse_peak = peak_memory(markdown_to_html_node, markdown)
+    html, serialize_peak = peak_memory(node.to_html)
+    results["document"] = {
+        "markdown_bytes": len(markdown),
+        "html_bytes": len(html),
+        "nodes": count_nodes(node),
+        "parse_peak_bytes": parse_peak,
+        "serialize_peak_bytes": serialize_peak,
+    }
+
+    for name, size in results["bytes_per_node"].items():
+        print(f"{name:16} {size:8.1f} bytes/node")
+    document = results["document"]
+    print(f"document: {document['markdown_bytes']} bytes of markdown, {document['nodes']} html nodes")
+    print(f"parse peak:     {document['parse_peak_bytes'] / 1e6:8.1f} MB")
+    print(f"serialize peak: {document['serialize_peak_bytes'] / 1e6:8.1f} MB")
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(results, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Times link and image extraction on adversarial inputs at doubling sizes.
+
+    python3 bench/bench_redos.py [--sizes 1000,2000,...] [--repeat R] [--legacy] [--json out.json]
+
+For a linear scanner every doubling of the input should roughly double the time,
+so the "x" column should hover around 2. --legacy also runs the regexes the
+scanner replaced, on sizes small enough to finish.
+"""
+import argparse, json, os, platform, re, statistics, sys, time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+
+from textnode import *
+
+# what extract_markdown_links and extract_markdown_images used to run
+LEGACY_LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\(((?:[^()]*|\([^()]*\))*)\)")
+LEGACY_IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+
+# name -> (input of size n, largest n the legacy regexes can get through in reasonable time)
+CASES = {
+    # a link url that never closes, the nested * in the old pattern tries every way to split the x's
+    "unclosed_url": (lambda n: "[a](" + "x" * n, 22),
+    "repeated_unclosed_links": (lambda n: "[a](b" * (n // 5), 4000),
+    "bracket_paren_runs": (lambda n: "[](" * (n // 3), 4000),
+    "unclosed_images": (lambda n: "![a](" * (n // 5), 2000),
+    "open_brackets_then_link": (lambda n: "[" * n + "](x)", 8000),
+    "nested_parens": (lambda n: "[a](" + "(" * (n // 2) + ")" * (n // 2), 8000),
+    # the normal case, for scale
+    "many_links": (lambda n: "see [a link](/blog/tom) and ![pic](/images/tom.png) " * (n // 50), 64000),
+}
+
+
+def time_function(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"best_s": min(timings), "median_s": statistics.median(timings), "runs": repeat}
+
+
+def scanner_pass(text):
+    extract_markdown_links(text)
+    extract_markdown_images(text)
+
+
+def legacy_pass(text):
+    LEGACY_LINK_PATTERN.findall(text)
+    LEGACY_IMAGE_PATTERN.findall(text)
+
+
+def run(sizes, repeat, legacy):
+    results = {}
+    for name, (make_input, legacy_limit) in CASES.items():
+        case_sizes = sizes
+        if legacy and legacy_limit < sizes[0]:
+            # the exponential case only gets a handful of characters before the legacy regex stalls
+            case_sizes = [size for size in (14, 16, 18, 20, 22) if size <= legacy_limit] + sizes
+        rows = []
+        for size in case_sizes:
+            text = make_input(size)
+            row = {"size": len(text), "scanner": time_function(lambda: scanner_pass(text), repeat)}
+            if legacy and size <= legacy_limit:
+                row["legacy"] = time_function(lambda: legacy_pass(text), 1)
+            rows.append(row)
+        results[name] = rows
+    return {"python": platform.python_version(), "cases": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--sizes", default="1000,2000,4000,8000,16000,32000,64000",
+                        help="comma separated input sizes in characters")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy", action="store_true", help="also time the old regexes where they finish")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = run(sizes, args.repeat, args.legacy)
+    for name, rows in report["cases"].items():
+        print(name)
+        previous = None
+        for row in rows:
+            best = row["scanner"]["best_s"]
+            growth = f"x{best / previous:5.2f}" if previous else "      "
+            line = f"  {row['size']:8} chars  scanner {best * 1000:9.3f} ms {growth}"
+            if "legacy" in row:
+                line += f"   legacy {row['legacy']['best_s'] * 1000:10.3f} ms"
+            print(line)
+            previous = best
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
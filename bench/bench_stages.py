@@ -0,0 +1,93 @@
+"""
+Times every parsing and rendering stage on the same synthetic document.
+
+    python3 bench/bench_stages.py [--blocks N] [--seed S] [--repeat R] [--json out.json]
+
+Each stage is run --repeat times and the best and median wall time are kept.
+The json output is meant to be diffed between commits.
+"""
+import argparse, json, os, platform, statistics, sys, tempfile, time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+
+from textnode import *
+from synthetic import generate_markdown
+
+
+def time_stage(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"best_s": min(timings), "median_s": statistics.median(timings), "runs": repeat}
+
+
+def inline_texts(blocks):
+    # the text each block hands to text_to_children, roughly how markdown_to_html_node gets it
+    texts = []
+    for block in blocks:
+        block_type = block_to_block_type(block)
+        if block_type == BlockType.CODE:
+            continue
+        for line in block.split("\n"):
+            texts.append(line.lstrip("#>-0123456789. "))
+    return texts
+
+
+def run(blocks, seed, repeat):
+    markdown = generate_markdown(blocks, seed)
+    markdown_blocks = markdown_to_blocks(markdown)
+    texts = inline_texts(markdown_blocks)
+    node = markdown_to_html_node(markdown)
+    template_path = os.path.join(REPO_DIR, "template.html")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "index.md")
+        dest_path = os.path.join(temp_dir, "out", "index.html")
+        with open(source_path, 'w') as source_file:
+            source_file.write(markdown)
+
+        stages = {
+            "markdown_to_blocks": lambda: markdown_to_blocks(markdown),
+            "block_to_block_type": lambda: [block_to_block_type(block) for block in markdown_blocks],
+            "text_to_children": lambda: [text_to_children(text) for text in texts],
+            "markdown_to_html_node": lambda: markdown_to_html_node(markdown),
+            "to_html": node.to_html,
+            "generate_page": lambda: generate_page(source_path, template_path, dest_path, "/repo/"),
+        }
+        results = {name: time_stage(function, repeat) for name, function in stages.items()}
+
+    for name, result in results.items():
+        result["mb_per_s"] = len(markdown) / result["best_s"] / 1e6
+    return {
+        "input": {"blocks": blocks, "seed": seed, "markdown_bytes": len(markdown),
+                  "inline_texts": len(texts)},
+        "python": platform.python_version(),
+        "stages": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--blocks", type=int, default=2000, help="blocks in the synthetic document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    report = run(args.blocks, args.seed, args.repeat)
+    print(f"{report['input']['markdown_bytes']} bytes of markdown, {args.blocks} blocks, seed {args.seed}")
+    for name, result in report["stages"].items():
+        print(f"{name:24} best {result['best_s'] * 1000:9.2f} ms   median {result['median_s'] * 1000:9.2f} ms"
+              f"   {result['mb_per_s']:7.1f} MB/s")
+
+    if args.json:
+        with open(args.json, 'w') as json_file:
+            json.dump(report, json_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
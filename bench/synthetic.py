@@ -0,0 +1,90 @@
+"""
+Deterministic synthetic markdown for the benchmarks.
+
+The same seed and size always give the same document, so timings from two
+commits are measured on exactly the same input.
+"""
+import random
+
+
+WORDS = (
+    "the ring was forged in fire by the dark lord sauron in the land of mordor "
+    "where shadows lie and elves hobbits wizards dwarves men rode across middle earth "
+    "from the shire to rivendell through moria and lothlorien towards gondor"
+).split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def inline_text(rng, words=40):
+    # plain words with a healthy amount of every kind of inline markup mixed in
+    parts = []
+    for _ in range(words):
+        roll = rng.random()
+        word = rng.choice(WORDS)
+        if roll < 0.08:
+            parts.append(f"**{word} {rng.choice(WORDS)}**")
+        elif roll < 0.14:
+            parts.append(f"_{word}_")
+        elif roll < 0.18:
+            parts.append(f"`{word}()`")
+        elif roll < 0.22:
+            parts.append(f"[{word}](/blog/{rng.choice(WORDS)})")
+        elif roll < 0.24:
+            parts.append(f"![{word}](/images/{rng.choice(WORDS)}.png)")
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def heading(rng):
+    return "#" * rng.randint(2, 4) + " " + sentence(rng, 5)
+
+
+def paragraph(rng):
+    # wrapped over a few lines like hand written markdown usually is
+    return "\n".join(inline_text(rng, rng.randint(10, 25)) for _ in range(rng.randint(1, 4)))
+
+
+def unordered_list(rng):
+    return "\n".join("- " + inline_text(rng, rng.randint(3, 12)) for _ in range(rng.randint(2, 8)))
+
+
+def ordered_list(rng):
+    return "\n".join(f"{index}. " + inline_text(rng, rng.randint(3, 12)) for index in range(1, rng.randint(3, 9)))
+
+
+def quote(rng):
+    return "\n".join("> " + inline_text(rng, rng.randint(5, 15)) for _ in range(rng.randint(1, 4)))
+
+
+def code_block(rng):
+    lines = [f"def {rng.choice(WORDS)}_{index}(): return '{sentence(rng, 4)}'" for index in range(rng.randint(2, 10))]
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+# how often each block kind shows up, paragraphs dominate like on real pages
+BLOCK_KINDS = (
+    (paragraph, 0.45),
+    (heading, 0.12),
+    (unordered_list, 0.14),
+    (ordered_list, 0.09),
+    (quote, 0.10),
+    (code_block, 0.10),
+)
+
+
+def generate_markdown(blocks=1000, seed=0):
+    rng = random.Random(seed)
+    kinds = [kind for kind, weight in BLOCK_KINDS]
+    weights = [weight for kind, weight in BLOCK_KINDS]
+    document = ["# " + sentence(rng, 6)]
+    for _ in range(blocks):
+        document.append(rng.choices(kinds, weights)[0](rng))
+    return "\n\n".join(document) + "\n"
+
+
+if __name__ == "__main__":
+    print(generate_markdown(20))
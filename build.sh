@@ -9,4 +9,5 @@ python3 src/main.py "/$REPO_NAME/"
 # Print success message
 echo "Build completed! Files are now in the /docs directory."
 
-cd docs && python3 -m http.server 8000
+# Serve docs/ under the same basepath, at http://localhost:8000/$REPO_NAME/
+python3 src/main.py serve "/$REPO_NAME/" --port 8000
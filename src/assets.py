@@ -0,0 +1,206 @@
+import errno, logging, os, shutil
+
+from manifest import *
+from scan import *
+
+try:
+    import fcntl
+except ImportError:
+    # not on Windows, reflinks just aren't tried there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ways to put a static file into docs/, fastest first. A publish strategy starts at
+# one of these and falls back along the rest until one works on this filesystem:
+#   reflink     copy-on-write clone (btrfs, xfs, apfs-style filesystems), no bytes copied
+#   hardlink    docs/ and static/ share the file, editing one edits the other
+#   copy_range  copy_file_range/sendfile, the kernel copies without a trip through python
+#   copy        a plain byte copy, works everywhere
+PUBLISH_STRATEGIES = ("reflink", "hardlink", "copy_range", "copy")
+DEFAULT_PUBLISH = "copy"
+
+# linux ioctl cloning a whole file into another
+FICLONE = 0x40049409
+# (source device, target device) pairs FICLONE already failed on, so the rest of the
+# sync falls back straight away instead of opening a temp file and trying each asset
+reflink_unsupported = set()
+
+
+def files_match(src_stat, target_path):
+    # same size and same mtime means rsync would consider it unchanged, so do we
+    try:
+        target_stat = os.stat(target_path)
+    except FileNotFoundError:
+        return False
+    return src_stat.st_size == target_stat.st_size and src_stat.st_mtime_ns == target_stat.st_mtime_ns
+
+
+def list_files(root):
+    # every file under root as a path relative to root, in a stable order, nothing if root doesn't exist;
+    # symlinked directories are followed like the old os.path.isdir recursion did
+    return scan_files(root, missing_ok=True)
+
+
+def publish_chain(publish=DEFAULT_PUBLISH):
+    # the strategies tried for publish, in order: the chosen one and every slower one after it
+    if publish not in PUBLISH_STRATEGIES:
+        raise ValueError(f"unknown publish strategy: {publish}")
+    return PUBLISH_STRATEGIES[PUBLISH_STRATEGIES.index(publish):]
+
+
+def reflink_file(src_path, temp_path):
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks need fcntl")
+    with open(src_path, 'rb') as src_file:
+        devices = (os.fstat(src_file.fileno()).st_dev, os.stat(os.path.dirname(temp_path) or ".").st_dev)
+        if devices in reflink_unsupported:
+            raise OSError(errno.EOPNOTSUPP, "reflinks aren't supported here")
+        with open(temp_path, 'wb') as temp_file:
+            try:
+                fcntl.ioctl(temp_file.fileno(), FICLONE, src_file.fileno())
+            except OSError as error:
+                if error.errno in (errno.EOPNOTSUPP, errno.EXDEV):
+                    reflink_unsupported.add(devices)
+                raise
+    shutil.copystat(src_path, temp_path)
+
+
+def copy_range_file(src_path, temp_path):
+    # the copy happens inside the kernel, copy_file_range where there is one, sendfile otherwise
+    with open(src_path, 'rb') as src_file, open(temp_path, 'wb') as temp_file:
+        src_fd, temp_fd = src_file.fileno(), temp_file.fileno()
+        size = os.fstat(src_fd).st_size
+        copied = 0
+        if hasattr(os, "copy_file_range"):
+            try:
+                while copied < size:
+                    sent = os.copy_file_range(src_fd, temp_fd, size - copied, copied, copied)
+                    if sent == 0:
+                        break
+                    copied += sent
+            except OSError as error:
+                # older kernels refuse some filesystem pairs, sendfile picks up from the start
+                if copied or error.errno not in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP):
+                    raise
+        if copied == 0 and size:
+            while copied < size:
+                sent = os.sendfile(temp_fd, src_fd, copied, size - copied)
+                if sent == 0:
+                    break
+                copied += sent
+    if copied != size:
+        # the source shrank mid-copy, publishing this with its mtime would hide it from every later sync
+        raise OSError(errno.EIO, f"short copy of {src_path}: {copied} of {size} bytes")
+    shutil.copystat(src_path, temp_path)
+
+
+PUBLISHERS = {
+    "reflink": reflink_file,
+    "hardlink": os.link,
+    "copy_range": copy_range_file,
+    "copy": shutil.copy2,
+}
+
+
+def publish_file(src_path, target_path, chain=(DEFAULT_PUBLISH,)):
+    # puts src_path at target_path with the first strategy in chain that works here,
+    # returns its name. Every strategy keeps the source's mtime (a hardlink simply is
+    # the source) and lands in a temp file first, so target_path is replaced in one step
+    temp_path = f"{target_path}.{os.getpid()}.publish"
+    if os.path.lexists(temp_path):
+        # left behind by a killed build
+        os.remove(temp_path)
+    for strategy in chain:
+        try:
+            PUBLISHERS[strategy](src_path, temp_path)
+        except OSError as error:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            if strategy == chain[-1]:
+                raise
+            logger.debug("Can't %s %s (%s), falling back", strategy, src_path, error)
+            continue
+        os.replace(temp_path, target_path)
+        return strategy
+
+
+def sync_file(src, target, rel_path, use_hash=False, chain=(DEFAULT_PUBLISH,)):
+    # brings one file in target up to date with src, returns "copied" or "unchanged",
+    # the metadata the manifest keeps for it and the publish strategy used (None if unchanged)
+    src_path = os.path.join(src, rel_path)
+    target_path = os.path.join(target, rel_path)
+    src_stat = os.stat(src_path)
+    entry = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+
+    if files_match(src_stat, target_path):
+        return "unchanged", entry, None
+    if use_hash and os.path.isfile(target_path) and os.path.getsize(target_path) == src_stat.st_size \
+            and hash_file(src_path) == hash_file(target_path):
+        # identical bytes, only the timestamp drifted (fresh checkout, touch, ...)
+        os.utime(target_path, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+        return "unchanged", entry, None
+
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    strategy = publish_file(src_path, target_path, chain)
+    logger.debug("Published %s (%s)", rel_path, strategy)
+    return "copied", entry, strategy
+
+
+def remove_synced_file(target, rel_path):
+    target_path = os.path.join(target, rel_path)
+    if os.path.isfile(target_path):
+        os.remove(target_path)
+        remove_empty_dirs(os.path.dirname(target_path), target)
+
+
+def sync_static(src, target, manifest, use_hash=False, publish=DEFAULT_PUBLISH, files=None):
+    """
+    Differential replacement for path_to_victory's wipe-and-copy.
+
+    Copies only files that are new or whose size/mtime changed, deletes only files
+    this sync copied on an earlier build whose source is gone, and preserves mtimes
+    with copy2 so downstream rsync/CDN uploads see no churn. With use_hash, files
+    whose metadata differs but whose contents are identical are left in place and
+    just get their mtime fixed up. publish picks how files get into target, see
+    PUBLISH_STRATEGIES. files is the listing of src when the caller already has one
+    (see scan_site), otherwise src is walked here.
+
+    Returns a dict with the relative paths that were copied, removed and left alone,
+    plus "strategies": the publish strategy each copied file got.
+    """
+    report = {"copied": [], "removed": [], "unchanged": [], "strategies": {}}
+    os.makedirs(target, exist_ok=True)
+
+    chain = publish_chain(publish)
+    synced = {}
+    for rel_path in list_files(src) if files is None else files:
+        action, synced[rel_path], strategy = sync_file(src, target, rel_path, use_hash, chain)
+        report[action].append(rel_path)
+        if strategy is not None:
+            report["strategies"][rel_path] = strategy
+
+    # only remove what we put there ourselves, generated pages share the same directory
+    for rel_path in sorted(set(manifest.assets) - set(synced)):
+        remove_synced_file(target, rel_path)
+        report["removed"].append(rel_path)
+
+    manifest.assets = synced
+    return report
+
+
+def sync_paths(src, target, manifest, changed, removed, use_hash=False, publish=DEFAULT_PUBLISH):
+    # targeted version of sync_static for when we already know which files changed
+    # (watch mode), paths are relative to src
+    report = {"copied": [], "removed": [], "unchanged": [], "strategies": {}}
+    chain = publish_chain(publish)
+    for rel_path in changed:
+        action, manifest.assets[rel_path], strategy = sync_file(src, target, rel_path, use_hash, chain)
+        report[action].append(rel_path)
+        if strategy is not None:
+            report["strategies"][rel_path] = strategy
+    for rel_path in removed:
+        if manifest.assets.pop(rel_path, None) is not None:
+            remove_synced_file(target, rel_path)
+            report["removed"].append(rel_path)
+    return report
@@ -0,0 +1,134 @@
+import os, pickle, tempfile, time
+from htmlnode import *
+
+# bump this whenever parsing markdown gives different nodes, so cached trees from an
+# older parser never end up in a page
+PARSER_VERSION = 2
+
+# next to the build manifest, never published
+DEFAULT_AST_CACHE_DIR = os.path.join(".build-cache", "ast")
+DEFAULT_AST_CACHE_BYTES = 256 * 1024 * 1024
+# pages bigger than this are streamed instead of parsed into one tree, so they aren't cached
+DEFAULT_MAX_SOURCE_BYTES = 8 * 1024 * 1024
+
+# temp files younger than this may still be written by another process (a preview next
+# to a build), evict() leaves them alone
+TEMP_GRACE_SECONDS = 60
+
+# only these get the basepath, see text_node_to_html_node
+RESOLVED_PROPS = {"a": "href", "img": "src"}
+
+
+def node_to_data(node):
+    # an html node tree as nested (tag, value or [children], props) tuples, props as
+    # (key, value) pairs. Compact to pickle and cheap to turn back into nodes
+    props = tuple(node.props.items()) if node.props is not None else None
+    if node.children is not None:
+        return (node.tag, [node_to_data(child) for child in node.children], props)
+    return (node.tag, node.value, props)
+
+
+def node_from_data(data, basepath="/"):
+    # rebuilds the nodes, cached trees are always parsed with basepath "/" so their
+    # link and image urls get this build's basepath here instead
+    tag, body, props = data
+    if props is not None:
+        resolved = RESOLVED_PROPS.get(tag)
+        if resolved is not None and basepath != "/":
+            props = tuple((key, resolve_url(value, basepath) if key == resolved else value) for key, value in props)
+        props = shared_props(*props)
+    if isinstance(body, list):
+        return ParentNode(tag, [node_from_data(child, basepath) for child in body], props)
+    return LeafNode(tag, body, props)
+
+
+class ASTCache:
+    """
+    Parsed pages on disk, keyed by the markdown's content hash and PARSER_VERSION.
+
+    An entry holds the page's front matter, title, html tree and the site paths it
+    links to (see text_to_children), so a page whose markdown didn't change renders
+    without being parsed at all, e.g. after a template or basepath change. Every
+    entry is its own file, written atomically, so parallel workers can fill the
+    cache at the same time. Reading an entry touches it, and evict() drops the
+    least recently used ones once the cache grows past max_bytes.
+    """
+
+    def __init__(self, directory=DEFAULT_AST_CACHE_DIR, max_bytes=DEFAULT_AST_CACHE_BYTES,
+                 max_source_bytes=DEFAULT_MAX_SOURCE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_source_bytes = max_source_bytes
+
+    def entry_path(self, source_hash):
+        return os.path.join(self.directory, f"v{PARSER_VERSION}-{source_hash}.pickle")
+
+    def load(self, source_hash):
+        # (metadata, title, tree data, refs) or None
+        path = self.entry_path(source_hash)
+        try:
+            with open(path, 'rb') as entry_file:
+                entry = pickle.load(entry_file)
+            os.utime(path)
+        except Exception:
+            # missing or broken, either way it's a miss and the page gets parsed (and stored) again
+            return None
+        return entry
+
+    def store(self, source_hash, metadata, title, tree, refs=()):
+        # tree is node_to_data() of the page's content node
+        os.makedirs(self.directory, exist_ok=True)
+        entry = (metadata, title, tree, list(refs))
+        # unique temp name, two pages with the same content can be stored at once
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, 'wb') as entry_file:
+                pickle.dump(entry, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.entry_path(source_hash))
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def evict(self):
+        # drops entries from other parser versions, then the least recently used ones
+        # until the cache fits in max_bytes, returns how many files were removed
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        current_prefix = f"v{PARSER_VERSION}-"
+        temp_cutoff_ns = time.time_ns() - TEMP_GRACE_SECONDS * 1_000_000_000
+        entries = []
+        removed = 0
+        # another process may be evicting or storing at the same time, files vanishing under us are fine
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+                if name.endswith(".tmp"):
+                    # temp files left by a killed build, not ones being written right now
+                    if stat.st_mtime_ns < temp_cutoff_ns:
+                        os.remove(path)
+                        removed += 1
+                    continue
+                if not name.startswith(current_prefix) or not name.endswith(".pickle"):
+                    # stale parser versions
+                    os.remove(path)
+                    removed += 1
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for mtime_ns, size, path in entries)
+        for mtime_ns, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
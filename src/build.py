@@ -0,0 +1,237 @@
+import fnmatch, logging, os, posixpath
+from concurrent.futures import ProcessPoolExecutor
+from textnode import *
+from manifest import *
+from metrics import *
+from astcache import *
+from pipeline import *
+from scan import *
+
+logger = logging.getLogger(__name__)
+
+def page_dest_path(source_path, dir_path_content, dest_dir_path):
+    # content/blog/tom/index.md -> docs/blog/tom/index.html
+    rel_path = os.path.relpath(source_path, dir_path_content)
+    return os.path.join(dest_dir_path, rel_path[:-3] + ".html")
+
+# characters that make an --only selector a pattern rather than a path
+GLOB_CHARS = "*?["
+
+def normalize_selector(selector, dir_path_content="content"):
+    # --only takes content/-relative paths, a leading content/ or ./ is tolerated
+    # a selector naming all of content/ is a ValueError, that's a full build and should be run as one
+    content_dir = os.path.normpath(dir_path_content).replace(os.sep, "/")
+    selector = posixpath.normpath(selector.replace(os.sep, "/")) if selector else ""
+    if selector == content_dir:
+        selector = ""
+    elif selector.startswith(content_dir + "/"):
+        selector = selector[len(content_dir) + 1:]
+    selector = selector.strip("/")
+    if selector in ("", ".", posixpath.basename(content_dir)):
+        raise ValueError(f"--only {selector or '/'} selects all of {dir_path_content}, leave --only out instead")
+    return selector
+
+def page_selected(rel_path, selectors):
+    # blog/tom/index.md is picked by blog, blog/tom, blog/tom/index.md, blog/tom/index or blog/*/index.md
+    # fnmatch's * matches / too, so blog/* is the whole subtree
+    for selector in selectors:
+        if selector == "":
+            return True
+        if fnmatch.fnmatchcase(rel_path, selector) or fnmatch.fnmatchcase(rel_path, selector + ".md") \
+                or fnmatch.fnmatchcase(rel_path, selector + "/*"):
+            return True
+    return False
+
+def dir_selected(rel_dir, selectors):
+    # whether anything under content/rel_dir could match, so discovery doesn't walk the rest of the site
+    rel_dir += "/"
+    for selector in selectors:
+        if selector == "":
+            return True
+        glob_at = min((selector.find(char) for char in GLOB_CHARS if char in selector), default=None)
+        literal = selector + "/" if glob_at is None else selector[:glob_at]
+        if rel_dir.startswith(literal) or literal.startswith(rel_dir):
+            return True
+    return False
+
+def scan_pages(dir_path_content, selectors=None):
+    # content/-relative paths of every markdown file, sorted
+    # with selectors (see normalize_selector) only matching pages are returned and
+    # directories that can't hold one aren't entered
+    if selectors is None:
+        return scan_files(dir_path_content, ".md")
+    return scan_files(dir_path_content, ".md",
+                      keep_dir=lambda rel_dir: dir_selected(rel_dir.replace(os.sep, "/"), selectors),
+                      keep_file=lambda rel_path: page_selected(rel_path.replace(os.sep, "/"), selectors))
+
+def scan_site(dir_path_content, static_dir=None, only=None):
+    # the one walk of content/ and static/ a build does, shared by the static sync and the page build
+    # returns {"pages": content/-relative markdown paths, "assets": static/-relative paths}, both sorted,
+    # without a static_dir (--skip-static) there are no assets
+    selectors = None if only is None else [normalize_selector(selector, dir_path_content) for selector in only]
+    return {
+        "pages": scan_pages(dir_path_content, selectors),
+        "assets": [] if static_dir is None else scan_files(static_dir, missing_ok=True),
+    }
+
+def discover_pages(dir_path_content, dest_dir_path, selectors=None, rel_paths=None):
+    # pairs every markdown file in content/ with the html file it renders to
+    # rel_paths is an existing scan_pages listing, otherwise content/ is walked here
+    if rel_paths is None:
+        rel_paths = scan_pages(dir_path_content, selectors)
+    # content/blog/tom/index.md -> docs/blog/tom/index.html
+    return [(os.path.join(dir_path_content, rel_path), os.path.join(dest_dir_path, rel_path[:-3] + ".html"))
+            for rel_path in rel_paths]
+
+def render_page(source_path, template, dest_path, basepath, metrics=None, ast_cache=None, source_hash=None):
+    # generate_page plus the site paths the page links to, module level so a worker process can run it
+    refs = set()
+    result = generate_page(source_path, template, dest_path, basepath, metrics, ast_cache, source_hash, refs)
+    return result, sorted(refs)
+
+def template_key(template_path, minify=False):
+    # what the manifest compares to decide the template changed, minifying changes every page too
+    # and so does a new PARSER_VERSION: the ASTCache drops its old parses, the pages rendered from them go as well
+    key = f"{hash_file(template_path)}+parser{PARSER_VERSION}"
+    return key + "+minify" if minify else key
+
+def render_pages(pages, template_path, basepath, jobs=1, metrics=None, ast_cache=None, source_hashes=None,
+                 io_threads=0, minify=False, keep_going=False):
+    # renders (source, dest) pairs, serially or on a pool of worker processes
+    # with io_threads and one job, reads and writes overlap parsing on background threads (see PagePipeline)
+    # the template is compiled once here and handed to every page
+    # with a BuildMetrics every page is timed and its PageMetrics collected into it
+    # with an ASTCache unchanged markdown isn't parsed again, source_hashes saves hashing it twice
+    # with minify the pages are written without the whitespace browsers ignore (see minify_html)
+    # with keep_going a page that fails to render is logged and left out instead of failing the rest (watch mode)
+    # returns source -> the site paths that page links to, see BuildManifest.pages_using
+    if source_hashes is None:
+        source_hashes = {}
+    template = load_template(template_path, basepath, minify)
+    page_refs = {}
+    
+    def page_metrics(source_path):
+        return None if metrics is None else PageMetrics(source_path)
+    
+    # the pipeline stops at the first failure, keep_going renders pages one by one instead
+    if io_threads > 0 and jobs <= 1 and len(pages) > 1 and not keep_going:
+        pipeline = PagePipeline(template, basepath, io_threads, ast_cache=ast_cache)
+        return pipeline.run(pages, metrics, source_hashes)
+    
+    if jobs <= 1 or len(pages) <= 1:
+        for source_path, dest_path in pages:
+            try:
+                result, page_refs[source_path] = render_page(source_path, template, dest_path, basepath,
+                                                             page_metrics(source_path), ast_cache,
+                                                             source_hashes.get(source_path))
+            except Exception as error:
+                if not keep_going:
+                    raise
+                logger.error(f"Failed to render {source_path}: {error}")
+                continue
+            if metrics is not None:
+                metrics.add_page(result)
+        return page_refs
+    
+    # biggest pages first so a few huge ones don't end up running alone at the end
+    ordered = sorted(pages, key=lambda page: os.path.getsize(page[0]), reverse=True)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [(source_path, executor.submit(render_page, source_path, template, dest_path, basepath,
+                                                 page_metrics(source_path), ast_cache,
+                                                 source_hashes.get(source_path)))
+                   for source_path, dest_path in ordered]
+        # result() re-raises whatever a worker hit, same as the serial build would
+        for source_path, future in futures:
+            try:
+                result, page_refs[source_path] = future.result()
+            except Exception as error:
+                if not keep_going:
+                    raise
+                logger.error(f"Failed to render {source_path}: {error}")
+                continue
+            if metrics is not None:
+                metrics.add_page(result)
+    return page_refs
+            
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, jobs=1):
+    # Ensure the destination directory exists
+    os.makedirs(dest_dir_path, exist_ok=True)
+    render_pages(discover_pages(dir_path_content, dest_dir_path), template_path, basepath, jobs)
+
+def build_pages(dir_path_content, template_path, dest_dir_path, basepath, manifest, force=False, jobs=1,
+                metrics=None, ast_cache=None, changed_assets=None, io_threads=0, minify=False, only=None,
+                sources=None, keep_going=False):
+    # incremental version of generate_pages_recursive: skips unchanged pages,
+    # prunes outputs whose markdown was deleted and saves the manifest for next time
+    # changed_assets are static/-relative paths copied or removed by this build's sync,
+    # pages linking to one of them are re-rendered even when their markdown didn't change
+    # only is a list of --only selectors: just the matching pages are discovered and
+    # rendered, and only deleted pages matching them are pruned
+    # sources is the scan_site listing of this build (made with the same only), otherwise content/ is walked here
+    # keep_going logs pages that fail to render and builds the rest (see render_pages), returns the failed sources
+    selectors = None if only is None else [normalize_selector(selector, dir_path_content) for selector in only]
+    key = template_key(template_path, minify)
+    # --force alone doesn't make the pages a partial build leaves out any older
+    outputs_changed = (key, basepath) != (manifest.template_hash, manifest.basepath)
+    manifest.begin_build(key, basepath, force)
+    if manifest.inputs_changed:
+        logger.info(f"Template, parser, basepath, --minify or --force changed, rebuilding every "
+                    f"{'selected ' if selectors is not None else ''}page")
+    dependents = set(manifest.pages_using(changed_assets)) if changed_assets else set()
+    
+    stale_pages = []
+    source_hashes = {}
+    asset_stale = 0
+    rel_paths = None if sources is None else sources["pages"]
+    for source_path, dest_path in discover_pages(dir_path_content, dest_dir_path, selectors, rel_paths):
+        source_hashes[source_path] = hash_file(source_path)
+        if not manifest.is_fresh(source_path, source_hashes[source_path], dest_path):
+            stale_pages.append((source_path, dest_path))
+        elif source_path in dependents:
+            logger.debug("Re-rendering page using a changed static file: %s", source_path)
+            stale_pages.append((source_path, dest_path))
+            asset_stale += 1
+        else:
+            logger.debug("Skipping unchanged page: %s", source_path)
+    if asset_stale:
+        logger.info(f"{asset_stale} page(s) use a changed static file")
+    if selectors is not None:
+        logger.info(f"--only matched {len(source_hashes)} page(s)")
+        if not source_hashes:
+            logger.warning(f"No page in {dir_path_content} matches --only {' '.join(only)}")
+    
+    page_refs = render_pages(stale_pages, template_path, basepath, jobs, metrics, ast_cache, source_hashes,
+                             io_threads, minify, keep_going)
+    failed = []
+    for source_path, dest_path in stale_pages:
+        if source_path in page_refs:
+            manifest.record(source_path, source_hashes[source_path], dest_path, page_refs[source_path])
+        else:
+            failed.append(source_path)
+    # whatever is left of their old output must not pass for fresh next time
+    manifest.invalidate(failed)
+    
+    if selectors is None:
+        removed = manifest.prune(dest_dir_path)
+    else:
+        # pages outside the selection weren't looked at, missing from seen doesn't mean deleted
+        unseen = set(manifest.pages) - manifest.seen
+        selected = {source_path for source_path in unseen
+                    if page_selected(os.path.relpath(source_path, dir_path_content).replace(os.sep, "/"), selectors)}
+        removed = [manifest.remove_page(source_path, dest_dir_path) for source_path in sorted(selected)
+                   if not os.path.exists(source_path)]
+        # whatever should have re-rendered them still applies, the next build picks them up
+        outdated = unseen - selected if outputs_changed else (unseen - selected) & dependents
+        manifest.invalidate(outdated)
+    for dest_path in removed:
+        logger.info("Removed page with deleted source: %s", dest_path)
+    manifest.save()
+    if ast_cache is not None:
+        ast_cache.evict()
+    
+    logger.info(f"Pages: {len(stale_pages) - len(failed)} rendered, {len(source_hashes) - len(stale_pages)} "
+                f"unchanged, {len(removed)} removed{f', {len(failed)} failed' if failed else ''}")
+    if metrics is not None:
+        metrics.count("pages_skipped", len(source_hashes) - len(stale_pages))
+        metrics.count("pages_removed", len(removed))
+    return failed
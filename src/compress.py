@@ -0,0 +1,89 @@
+import gzip, logging, os
+from concurrent.futures import ThreadPoolExecutor
+from assets import *
+
+logger = logging.getLogger(__name__)
+
+# text formats worth precompressing, images and fonts are compressed already
+COMPRESSIBLE_SUFFIXES = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map",
+                         ".webmanifest")
+# sidecars are written once and served many times, so the slowest level is the right default
+DEFAULT_GZIP_LEVEL = 9
+
+
+def gzip_file(path, level=DEFAULT_GZIP_LEVEL):
+    # writes path + ".gz" next to path and gives it path's mtime, which is how a later
+    # build knows the sidecar is still current. No name or timestamp in the gzip header,
+    # so the same content always gives the same bytes
+    sidecar_path = path + ".gz"
+    temp_path = f"{sidecar_path}.{os.getpid()}.tmp"
+    with open(path, 'rb') as source_file, open(temp_path, 'wb') as temp_file:
+        with gzip.GzipFile(filename="", mode='wb', fileobj=temp_file, compresslevel=level, mtime=0) as gzip_file:
+            for chunk in iter(lambda: source_file.read(1 << 16), b""):
+                gzip_file.write(chunk)
+    stat = os.stat(path)
+    os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temp_path, sidecar_path)
+
+
+def sidecar_is_fresh(path, level, recorded_level):
+    if recorded_level != level:
+        return False
+    try:
+        return os.stat(path + ".gz").st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def remove_sidecar(public_dir, rel_path):
+    sidecar_path = os.path.join(public_dir, rel_path + ".gz")
+    if os.path.isfile(sidecar_path):
+        os.remove(sidecar_path)
+        remove_empty_dirs(os.path.dirname(sidecar_path), public_dir)
+
+
+def compress_outputs(public_dir, manifest, level=DEFAULT_GZIP_LEVEL, workers=None):
+    """
+    Keeps a .gz sidecar next to every compressible file in public_dir, for hosts
+    that serve precompressed files instead of compressing on every request.
+
+    Only files without a current sidecar (new, rewritten since, or compressed at
+    another level) are compressed, on a thread pool since zlib lets go of the GIL.
+    Sidecars of files that are gone are deleted. The manifest remembers which
+    sidecars this wrote, so a .gz that came from static/ is never touched.
+
+    Returns a dict with the relative paths (of the originals) whose sidecar was
+    compressed, removed or left alone.
+    """
+    report = {"compressed": [], "removed": [], "unchanged": []}
+    sidecars = {}
+    for rel_path in list_files(public_dir):
+        if not rel_path.endswith(COMPRESSIBLE_SUFFIXES) or rel_path + ".gz" in manifest.assets:
+            continue
+        sidecars[rel_path] = level
+        if sidecar_is_fresh(os.path.join(public_dir, rel_path), level, manifest.sidecars.get(rel_path)):
+            report["unchanged"].append(rel_path)
+        else:
+            report["compressed"].append(rel_path)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() so a failed file raises here
+        list(executor.map(lambda rel_path: gzip_file(os.path.join(public_dir, rel_path), level),
+                          report["compressed"]))
+    for rel_path in report["compressed"]:
+        logger.debug("Compressed %s.gz", rel_path)
+
+    for rel_path in sorted(set(manifest.sidecars) - set(sidecars)):
+        remove_sidecar(public_dir, rel_path)
+        report["removed"].append(rel_path)
+    manifest.sidecars = sidecars
+    return report
+
+
+def remove_sidecars(public_dir, manifest):
+    # for builds without --gzip: sidecars left from an earlier build would serve stale pages
+    removed = sorted(manifest.sidecars)
+    for rel_path in removed:
+        remove_sidecar(public_dir, rel_path)
+    manifest.sidecars = {}
+    return removed
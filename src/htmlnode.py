@@ -1,6 +1,37 @@
+import mmap
+from urllib.parse import unquote
 from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
 from conversion import *
+from minify import *
+
+@lru_cache(maxsize=4096)
+def shared_props(*items):
+    # read-only props mapping shared by every node with the same attributes, so the
+    # same link or image showing up all over a page doesn't allocate a dict each time
+    # items are (key, value) pairs: shared_props(("href", "/blog"))
+    return MappingProxyType(dict(items))
+
+def resolve_url(url, basepath):
+    # root-relative urls ("/images/tom.png") get the site's basepath in front,
+    # absolute, relative and protocol-relative ("//cdn...") urls are left alone
+    if basepath == "/" or not url.startswith("/") or url.startswith("//"):
+        return url
+    return basepath + url[1:]
+
+def local_ref(url):
+    # the site path a root-relative url points at, "/images/tom.png?v=2" -> "images/tom.png",
+    # None for absolute, relative and protocol-relative urls
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    return path[1:] or None
+
 class HTMLNode:
+    # __slots__ keeps nodes small, big pages create hundreds of thousands of them
+    __slots__ = ("tag", "value", "children", "props")
+    
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -9,6 +40,17 @@ class HTMLNode:
     
     def to_html(self):
         raise NotImplementedError()
+    
+    def iter_html(self):
+        # yields the html in fragments, subclasses decide how to split it up
+        raise NotImplementedError()
+    
+    def write_html(self, stream, minify=False):
+        # writes the html straight into a file-like object instead of building one big string
+        # with minify, whitespace in text collapses the way a browser would show it anyway,
+        # except inside pre and code
+        for fragment in self.iter_html():
+            stream.write(fragment)
         
     def props_to_html(self):
         if not self.props:
@@ -23,6 +65,8 @@ class HTMLNode:
         return f"Tag: {self.tag}\nValue: {self.value}\nChildren: {self.children}\nProps: {self.props}"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+    
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
     
@@ -34,46 +78,145 @@ class LeafNode(HTMLNode):
         else:
             props_html = self.props_to_html()
             return f"<{self.tag}{props_html}>{self.value}</{self.tag}>"
+    
+    def iter_html(self):
+        # a leaf is small enough to be a single fragment
+        yield self.to_html()
+    
+    def write_html(self, stream, minify=False):
+        if minify and self.value is not None and self.tag not in PRESERVE_TAGS:
+            value = collapse_whitespace(self.value)
+            if self.tag is None:
+                stream.write(value)
+            else:
+                stream.write(f"<{self.tag}{self.props_to_html()}>{value}</{self.tag}>")
+            return
+        stream.write(self.to_html())
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+    
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
     
     def to_html(self):
+        # join the fragments once instead of += at every level of the tree
+        return "".join(self.iter_html())
+    
+    def check_node(self):
         if self.tag is None:
             raise ValueError("All Parent Nodes must have tag")
         if self.children is None:
             raise ValueError("All Parents Need a Child Ol, Son!!!")
-        
-        parent_node_children = "" 
+    
+    def iter_html(self):
+        self.check_node()
+        yield f"<{self.tag}{self.props_to_html()}>"
         for child in self.children:
-            parent_node_children += child.to_html()
-            
-        props_html = self.props_to_html() 
-        return f"<{self.tag}{props_html}>{parent_node_children}</{self.tag}>"
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
+    
+    def write_html(self, stream, minify=False):
+        # plain recursion is cheaper than stacking generators when we have somewhere to write
+        self.check_node()
+        if minify and self.tag in PRESERVE_TAGS:
+            # code blocks are written exactly as they are
+            minify = False
+        stream.write(f"<{self.tag}{self.props_to_html()}>")
+        if minify:
+            for child in self.children:
+                child.write_html(stream, True)
+        else:
+            for child in self.children:
+                child.write_html(stream)
+        stream.write(f"</{self.tag}>")
 
 
 
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    new_blocks = []
-    for block in blocks:
-        stripped_block = block.strip()
-        if not block:
-            continue
-        
+    return list(iter_blocks(markdown))
+
+FENCE = "```"
+
+def iter_lines(source):
+    # the lines of a markdown source without their line endings, one at a time
+    # source can be a str, a text or binary file object, or an mmap (bytes are read as utf-8)
+    if isinstance(source, str):
+        # walks the string with find instead of split so it isn't copied line by line up front
+        start = 0
+        while True:
+            end = source.find("\n", start)
+            if end == -1:
+                yield source[start:]
+                return
+            yield source[start:end]
+            start = end + 1
+    
+    if isinstance(source, mmap.mmap):
+        source = iter(source.readline, b"")
+    for line in source:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        yield line.rstrip("\r\n")
+
+def _join_block(lines):
+    # drop the whitespace-only lines at either end, a block of nothing but those becomes ""
+    start, end = 0, len(lines)
+    while start < end and not lines[start]:
+        start += 1
+    while end > start and not lines[end - 1]:
+        end -= 1
+    return "\n".join(lines[start:end])
+
+def iter_blocks(source):
+    """
+    Yields the blocks of a markdown source one at a time, so only the current
+    block is ever held in memory. source is anything iter_lines takes.
+
+    Blocks end at an empty line and every line is stripped, like markdown_to_blocks
+    always did. A ``` fence runs until its closing fence, blank lines included, and
+    its code lines only lose the fence's own indentation.
+    """
+    block = []
+    fence_indent = None
+    for line in iter_lines(source):
+        stripped = line.strip()
         
-        if "\n" in block:
-            strings = stripped_block.split("\n")
-            fixed_block = []
-            for string in strings:
-                stripped_string = string.strip()
-                fixed_block.append(stripped_string)
-            stripped_block ="\n".join(fixed_block)
-            
+        if fence_indent is not None:
+            if stripped.startswith(FENCE) and not stripped.strip("`"):
+                # closing fence, the code block is done whether or not a blank line follows
+                block.append(stripped)
+                yield "\n".join(block)
+                block = []
+                fence_indent = None
+            elif line[:fence_indent].isspace() or fence_indent == 0:
+                block.append(line[fence_indent:].rstrip())
+            else:
+                block.append(stripped)
+            continue
         
-        new_blocks.append(stripped_block)
-    return new_blocks
+        if stripped.startswith(FENCE):
+            # a fence starts its own block even without a blank line before it
+            if block:
+                yield _join_block(block)
+                block = []
+            if len(stripped) > len(FENCE) * 2 and stripped.endswith(FENCE):
+                # ```code``` on a single line
+                yield stripped
+                continue
+            fence_indent = len(line) - len(line.lstrip())
+            block.append(stripped)
+        elif not line:
+            # only a truly empty line splits, same as splitting on "\n\n" did
+            if block:
+                yield _join_block(block)
+                block = []
+        else:
+            block.append(stripped)
+    
+    if block:
+        # an unclosed fence just runs to the end of the file
+        yield "\n".join(block) if fence_indent is not None else _join_block(block)
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -84,68 +227,108 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered_list"
     
 def block_to_block_type(block_text):
+    return classify_block(block_text)[0]
+
+# "1. ", "2. ", ... grown as longer ordered lists show up
+_ordered_prefixes = []
+
+def ordered_prefixes(count):
+    while len(_ordered_prefixes) < count:
+        _ordered_prefixes.append(f"{len(_ordered_prefixes) + 1}. ")
+    return _ordered_prefixes
+
+def classify_block(block_text):
+    """
+    Works out a block's type in one pass and returns it with the block's lines,
+    so rendering doesn't have to split the block again.
+
+    The first character already rules out all but one type: only a # block can be
+    a heading, only ``` code, only > a quote, only - an unordered list and only 1
+    an ordered list. Anything that fails its one check is a paragraph.
+    """
+    lines = block_text.split('\n')
+    first = block_text[:1]
+    
     # Check if Heading
-    if block_text.startswith('#'):
+    if first == '#':
         # Check if there are no newlines in the text (must be a single line)
-        if '\n' not in block_text:
-            # Check if it follows heading format (# followed by space)
-            parts = block_text.split(' ', 1)
-            if len(parts) > 1 and 1 <= len(parts[0]) <= 6 and all(char == '#' for char in parts[0]):
-                return BlockType.HEADING
+        if len(lines) == 1:
+            # Check if it follows heading format (1 to 6 # followed by space)
+            hashes = block_text.find(' ')
+            if 1 <= hashes <= 6 and block_text.count('#', 0, hashes) == hashes:
+                return BlockType.HEADING, lines
     
     # Check if Code block
-    elif block_text.startswith('```') and block_text.endswith('```'):
-        return BlockType.CODE
+    elif first == '`':
+        if block_text.startswith('```') and block_text.endswith('```'):
+            return BlockType.CODE, lines
     
-    # Check if Quote block
-    lines = block_text.split('\n')
-    is_quote = True
-    for line in lines:
-        if not line.startswith('>'):
-            is_quote = False
-            break
-    if is_quote:
-        return BlockType.QUOTE
-   
-    #check if unordered
-    is_unordered = True
-    #iterates line by line checking for proper start breaks out if condition not there
-    for line in lines:
-        if not line.startswith('- '):
-            is_unordered = False
-            break
-    if is_unordered:
-        return BlockType.UNORDERED_LIST
-    
-    #checks if ordered
-    is_ordered = True
-    
-    #enumerates line by line
-    for i, line in enumerate(lines):
-        #checks if line has proper start of not breaks out if not utilizing i and enumeration to get the proper number
-        expected_prefix = f"{i+1}. "
-        if not line.startswith(expected_prefix):
-            is_ordered = False
-            break
-    if is_ordered:
-        return BlockType.ORDERED_LIST #returns only if is_ordered true
-
+    # Check if Quote block, every line starts with > when every newline is followed by one
+    elif first == '>':
+        if block_text.count('\n>') == len(lines) - 1:
+            return BlockType.QUOTE, lines
+    
+    #check if unordered, same trick with "- "
+    elif first == '-':
+        if block_text.startswith('- ') and block_text.count('\n- ') == len(lines) - 1:
+            return BlockType.UNORDERED_LIST, lines
+    
+    #checks if ordered, line i has to start with "i. "
+    elif first == '1':
+        if all(map(str.startswith, lines, ordered_prefixes(len(lines)))):
+            return BlockType.ORDERED_LIST, lines
 
     #if nothing else returns as paragraph type 
-    return BlockType.PARAGRAPH
+    return BlockType.PARAGRAPH, lines
 
 
 #new function
 def extract_title(markdown):
-    if len(markdown) == 0:
+    # markdown is a str or anything else iter_lines takes, the scan stops at the first title
+    if isinstance(markdown, str) and len(markdown) == 0:
         raise Exception("string cannot be empty")
 
-    # Split the markdown into lines and search for a title
-    for line in markdown.split("\n"):
+    # Go through the markdown line by line and search for a title
+    for line in iter_lines(markdown):
         if line.startswith("#"):
             if len(line[1:].strip()) != 0:
                 # Remove the token "#" and strip leading/trailing whitespace
                 return line[1:].strip()
 
     # If we reach here, no title was found
-    raise Exception("invalid markdown title format, Ol son")
\ No newline at end of file
+    raise Exception("invalid markdown title format, Ol son")
+
+def split_front_matter(lines):
+    # optional front matter at the very top of a page, feeds extra {{ name }} template slots:
+    # ---
+    # author: J.R.R. Tolkien
+    # ---
+    # reads it off an iterator of lines, returns the metadata dict and how many lines
+    # it took up, (empty dict, 0) when the page has none
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None or not first.startswith("---") or first.strip() != "---":
+        return {}, 0
+
+    metadata = {}
+    for index, line in enumerate(lines, 1):
+        if line.strip() == "---":
+            return metadata, index + 1
+        if not line.strip():
+            continue
+        key, separator, value = line.partition(":")
+        if not separator or not key.strip():
+            # not a key: value line, so this was never front matter to begin with
+            return {}, 0
+        metadata[key.strip()] = value.strip()
+
+    # no closing --- means it's just markdown that happens to start with a rule
+    return {}, 0
+
+def extract_metadata(markdown):
+    # returns the metadata dict and the markdown with the front matter removed
+    metadata, header_length = split_front_matter(iter_lines(markdown))
+    if header_length == 0:
+        return {}, markdown
+    parts = markdown.split("\n", header_length)
+    return metadata, parts[header_length] if len(parts) > header_length else ""
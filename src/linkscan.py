@@ -0,0 +1,149 @@
+from bisect import bisect_left
+
+def find_all(text, substring):
+    # every index substring starts at, a find loop beats finditer when there are only a few
+    found = []
+    index = text.find(substring)
+    while index != -1:
+        found.append(index)
+        index = text.find(substring, index + 1)
+    return found
+
+
+class LinkScanner:
+    r"""
+    Finds markdown links and images in one string without backtracking.
+
+    Matches exactly what these two patterns used to match:
+        image: !\[(.*?)\]\((.*?)\)
+        link:  (?<!!)\[(.*?)\]\(((?:[^()]*|\([^()]*\))*)\)
+    The link one backtracks exponentially on an unclosed "(", so instead the
+    positions of newlines, "](" pairs and parentheses are indexed once and every
+    lookup is a bisect into those, which keeps a whole scan linear.
+
+    A match is a tuple of offsets into the text:
+        (start, end, text_start, text_end, url_start, url_end)
+    so callers can slice, or keep spans, as they like.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        # text[j] == "]" and text[j + 1] == "(", where link and image text can end
+        self.openers = find_all(text, "](")
+        self.newlines = find_all(text, "\n")
+        self.closing_parens = find_all(text, ")")
+        self.parens = sorted(find_all(text, "(") + self.closing_parens)
+        # paren index -> end of the link url running through it, filled in as links are looked up
+        self.url_ends = {}
+        # (endpos, start, line_end) of the last "[" that didn't start a link: every later "["
+        # before line_end can only pick from the same "](" candidates, so it can't either
+        self.link_failed = (None, 0, 0)
+
+    def url_end(self, position):
+        # the ")" closing a link url that starts at position, -1 if there isn't one
+        # a ")" ends the url, a "(" has to be closed by the very next paren and the url
+        # goes on after it. Every paren walked over gets the answer remembered, so
+        # overlapping urls never walk the same stretch twice
+        text, parens, url_ends = self.text, self.parens, self.url_ends
+        p = bisect_left(parens, position)
+        walked = []
+        while p < len(parens) and p not in url_ends:
+            walked.append(p)
+            if text[parens[p]] == ")":
+                url_ends[p] = parens[p]
+                break
+            if p + 1 < len(parens) and text[parens[p + 1]] == ")":
+                p += 2
+            else:
+                # a second "(" before the first one closed, or it never closes
+                url_ends[p] = -1
+                break
+        result = url_ends.get(p, -1)
+        for p in walked:
+            url_ends[p] = result
+        return result
+
+    def line_end(self, position, endpos):
+        # link and image text can't run past a newline (or the end of the search)
+        n = bisect_left(self.newlines, position)
+        if n < len(self.newlines) and self.newlines[n] < endpos:
+            return self.newlines[n]
+        return endpos
+
+    def image_at(self, index, endpos=None):
+        # the image starting exactly at index, or None
+        text = self.text
+        if endpos is None:
+            endpos = len(text)
+        if not text.startswith("![", index, endpos):
+            return None
+        line_end = self.line_end(index, endpos)
+        o = bisect_left(self.openers, index + 2)
+        if o == len(self.openers) or self.openers[o] >= line_end:
+            return None
+        opener = self.openers[o]
+        # the url is everything up to the first ")", only the first "](" can work:
+        # a later one would need a ")" even further along the same line
+        c = bisect_left(self.closing_parens, opener + 2)
+        if c == len(self.closing_parens) or self.closing_parens[c] >= line_end:
+            return None
+        close = self.closing_parens[c]
+        return (index, close + 1, index + 2, opener, opener + 2, close)
+
+    def link_at(self, index, endpos=None):
+        # the link starting exactly at index, or None
+        # like the old pattern's lookbehind, a "!" right before index makes it an image instead
+        text = self.text
+        if endpos is None:
+            endpos = len(text)
+        if index >= endpos or text[index] != "[" or (index > 0 and text[index - 1] == "!"):
+            return None
+        failed_endpos, failed_start, failed_line_end = self.link_failed
+        if failed_endpos == endpos and failed_start <= index < failed_line_end:
+            return None
+        line_end = self.line_end(index, endpos)
+        openers = self.openers
+        o = bisect_left(openers, index + 1)
+        # the shortest link text whose url fits before endpos wins
+        while o < len(openers) and openers[o] < line_end:
+            url_end = self.url_end(openers[o] + 2)
+            if url_end != -1 and url_end < endpos:
+                opener = openers[o]
+                return (index, url_end + 1, index + 1, opener, opener + 2, url_end)
+            o += 1
+        self.link_failed = (endpos, index, line_end)
+        return None
+
+    def find_image(self, pos=0, endpos=None):
+        # the first image at or after pos, or None
+        if endpos is None:
+            endpos = len(self.text)
+        index = self.text.find("![", pos, endpos)
+        while index != -1:
+            match = self.image_at(index, endpos)
+            if match is not None:
+                return match
+            index = self.text.find("![", index + 1, endpos)
+        return None
+
+    def iter_images(self, pos=0, endpos=None):
+        # every image between pos and endpos, left to right and non-overlapping like finditer
+        while True:
+            match = self.find_image(pos, endpos)
+            if match is None:
+                return
+            yield match
+            pos = match[1]
+
+    def iter_links(self, pos=0, endpos=None):
+        # every link between pos and endpos, left to right and non-overlapping like finditer
+        if endpos is None:
+            endpos = len(self.text)
+        index = self.text.find("[", pos, endpos)
+        while index != -1:
+            match = self.link_at(index, endpos)
+            if match is None:
+                index = self.text.find("[", index + 1, endpos)
+            else:
+                yield match
+                index = self.text.find("[", match[1], endpos)
@@ -1,44 +1,48 @@
 import os
-import shutil, sys
+import argparse, logging, shutil, sys, time
 from textnode import *
+from manifest import *
+from assets import *
+from build import *
+from watch import *
+from metrics import *
+from astcache import *
+from compress import *
+from serve import *
+from preview import *
 
-def path_to_victory(src, target):
+logger = logging.getLogger(__name__)
+
+def path_to_victory(src, target, chain=(DEFAULT_PUBLISH,), files=None):
      # Only clean and create the target directory on the initial call
-    print(f"Checking if {target} exists...")
+    logger.debug("Checking if %s exists...", target)
     if os.path.exists(target):
-        print(f"Cleaning {target} directory...")
-        # Remove all contents but keep the directory
-        for item in os.listdir(target):
-            item_path = os.path.join(target, item)
-            if os.path.isfile(item_path):
-                os.remove(item_path)
-            else:
-                shutil.rmtree(item_path)
+        logger.debug("Cleaning %s directory...", target)
+        # Remove all contents but keep the directory, scandir already knows which entries are directories
+        with os.scandir(target) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
     else:
         # Create the target directory if it doesn't exist
-        print(f"Creating {target} directory...")
+        logger.debug("Creating %s directory...", target)
         os.mkdir(target)
     
-   # Get a list of all items in the source directory
-    items = os.listdir(src)
+   # Get a list of all files under the source directory, the build's scan_site listing when there is one
+    items = list_files(src) if files is None else files
     
-    # Now, for each item in the source directory
+    # Now, for each file, publish it (every strategy keeps the mtime so a later sync sees it as unchanged)
     for item in items:
         # Create full paths for source and destination
         src_path = os.path.join(src, item)
         target_path = os.path.join(target, item)
         
-        # If it's a file, copy it
-        if os.path.isfile(src_path):
-            print(f"Copying file: {src_path} to {target_path}")
-            shutil.copy(src_path, target_path)
-        # If it's a directory, create it in the target and recurse
-        else:
-            print(f"Processing directory: {src_path}")
-            os.mkdir(target_path)
-            # 1. Create the directory in the target
-            # 2. Recursively call this function
-            path_to_victory(src_path, target_path)
+        # directories come into existence with the first file in them
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        strategy = publish_file(src_path, target_path, chain)
+        logger.debug("Copied file: %s to %s (%s)", src_path, target_path, strategy)
         
         tempstring = """""
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
@@ -69,50 +73,184 @@ def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, bas
             generate_pages_recursive(source_path, template_path, dest_subdir, basepath)
             """
             
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    # Ensure the destination directory exists
-    os.makedirs(dest_dir_path, exist_ok=True)
-    for entry in os.listdir(dir_path_content):
-        
-        source_path = os.path.join(dir_path_content, entry)
-        if entry.endswith(".md"):
-            # Create destination path (change .md to .html)
-                html_filename = entry[:-3] + ".html"  # Remove .md and add .html
-                dest_path = os.path.join(dest_dir_path, html_filename)
-                
-                generate_page(source_path, template_path, dest_path, basepath)
-                
-                print("generated singualar page")
-                
-        elif os.path.isdir(source_path):
-            # If directory, make recursive call
-            # Create corresponding destination directory path
-            dest_subdir = os.path.join(dest_dir_path, entry)
-            
-            print("recursive call utilized")
-            print(f"Recursing into: {source_path} -> {dest_subdir}")
-            generate_pages_recursive(source_path, template_path, dest_subdir, basepath)
-            
-def main():
+# optional first argument, anything else is treated as the basepath like before
+COMMANDS = ("build", "watch", "serve", "preview")
+
+def parse_args(argv):
+    command = "build"
+    if argv and argv[0] in COMMANDS:
+        command, argv = argv[0], argv[1:]
+    
+    parser = argparse.ArgumentParser(
+        description="Build the static site from content/ into docs/",
+        usage="main.py [build|watch|serve|preview] [basepath] [options]",
+    )
+    parser.add_argument("basepath", nargs="?", default="/",
+                        help="prefix applied to root-relative href/src links, serve and preview: the url prefix the "
+                             "site is served under (default: /)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the build manifest and re-render every page")
+    parser.add_argument("--clean", action="store_true",
+                        help="wipe docs/ and copy static/ from scratch instead of syncing")
+    parser.add_argument("--checksum", action="store_true",
+                        help="when size or mtime differ, compare file contents before copying a static file")
+    parser.add_argument("--only", action="append", metavar="PATH",
+                        help="only discover and render pages under this content/-relative path or matching this "
+                             "glob (blog/tom, blog/*/index.md), can be repeated; pages outside it are left as they "
+                             "are in docs/")
+    parser.add_argument("--skip-static", action="store_true",
+                        help="don't sync static/ into docs/ this time")
+    parser.add_argument("--publish", choices=PUBLISH_STRATEGIES, default=DEFAULT_PUBLISH,
+                        help="how static files get into docs/, falling back to the next one where the filesystem "
+                             "can't: reflink, hardlink (docs/ then shares the files with static/), "
+                             "copy_range, copy (default: %(default)s)")
+    parser.add_argument("--minify", action="store_true",
+                        help="leave out the whitespace and comments browsers ignore, pre and code stay untouched")
+    parser.add_argument("--gzip", action="store_true",
+                        help="write a .gz sidecar next to every html, css, js, ... file in docs/ whose content "
+                             "changed")
+    # a separate option, an optional level on --gzip itself would take the basepath after it for one
+    parser.add_argument("--gzip-level", type=int, choices=range(1, 10), metavar="LEVEL",
+                        help=f"compression level of the --gzip sidecars, 1-9 (default: {DEFAULT_GZIP_LEVEL})")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="render pages on this many worker processes (default: 1)")
+    parser.add_argument("--io-threads", type=int, default=0, metavar="N",
+                        help="with -j 1, prefetch markdown and write html on background threads (N writers) "
+                             "while pages are parsed, for slow or network filesystems (default: off)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help="serve and preview: port to listen on (default: %(default)s)")
+    parser.add_argument("--bind", default="", metavar="ADDRESS",
+                        help="serve and preview: address to listen on (default: all interfaces)")
+    parser.add_argument("--interval", type=float, default=0.5,
+                        help="watch: seconds between checks for changes (default: 0.5)")
+    parser.add_argument("--no-ast-cache", action="store_true",
+                        help="parse every page from scratch instead of reusing parses of unchanged markdown")
+    parser.add_argument("--ast-cache-size", type=int, default=DEFAULT_AST_CACHE_BYTES // (1024 * 1024), metavar="MB",
+                        help="evict the least recently used parses past this size (default: %(default)s)")
+    parser.add_argument("--metrics", metavar="OUT.json",
+                        help="time every stage of every page and write a json report here")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every page and file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    args = parser.parse_args(argv)
+    if args.clean and (args.only or args.skip_static):
+        parser.error("--clean wipes docs/, it can't be combined with --only or --skip-static")
+    if args.gzip_level is not None and not args.gzip:
+        parser.error("--gzip-level only applies with --gzip")
+    # the level the sidecars are written at, None without --gzip
+    args.gzip_level = (args.gzip_level or DEFAULT_GZIP_LEVEL) if args.gzip else None
+    if command == "watch" and (args.only or args.skip_static):
+        parser.error("watch always builds the whole site, --only and --skip-static are for build")
+    for selector in args.only or ():
+        try:
+            normalize_selector(selector)
+        except ValueError as error:
+            parser.error(str(error))
+    args.command = command
+    return args
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    basepath = args.basepath
+    
+    # per page messages are debug so big builds don't pay for printing them
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=level, format="%(message)s")
+    
     public_dir = "docs"
     content_file = 'content'
     template_file = "template.html"
     
     
     
+    if args.command == "serve":
+        # serves what the last build left in docs/, under the basepath it was built for
+        serve(public_dir, basepath, args.bind, args.port)
+        return
+    
+    # parsed pages survive template and basepath changes, only the markdown itself invalidates them
+    ast_cache = None if args.no_ast_cache else ASTCache(max_bytes=args.ast_cache_size * 1024 * 1024)
+    
+    if args.command == "preview":
+        # renders pages from content/ as they're requested, nothing is written to docs/
+        preview(content_file, "static", template_file, basepath, args.bind, args.port, ast_cache, args.minify)
+        return
+    
+    manifest = BuildManifest()
+    
+    if args.command == "watch":
+        # keeps rebuilding whatever changes until interrupted
+        if args.clean:
+            path_to_victory("static", public_dir, publish_chain(args.publish))
+        watcher = SiteWatcher(content_file, "static", template_file, public_dir, basepath, manifest, args.jobs,
+                              ast_cache, args.publish, args.gzip_level, args.minify, args.checksum, args.force)
+        watcher.run(args.interval)
+        return
+    
+    metrics = BuildMetrics() if args.metrics else None
+    start = time.perf_counter()
+    
     # Use the actual paths you need for your project
-    path_to_victory("static", public_dir)
-    print("Static files copied successfully!")
+    # content/ and static/ are walked once, the sync and the page build both work off this listing
+    scan_start = time.perf_counter()
+    sources = scan_site(content_file, None if args.skip_static else "static", args.only)
+    if metrics is not None:
+        metrics.add_phase("scan", time.perf_counter() - scan_start)
+    
+    static_start = time.perf_counter()
+    if args.clean:
+        path_to_victory("static", public_dir, publish_chain(args.publish), sources["assets"])
+    if args.skip_static:
+        # whatever static/ had last time stays in docs/
+        report = {"copied": [], "removed": [], "unchanged": [], "strategies": {}}
+        logger.info("Static files not synced, --skip-static")
+    else:
+        # after a clean copy this just records what's there, otherwise it copies only what changed
+        report = sync_static("static", public_dir, manifest, args.checksum, args.publish, sources["assets"])
+    strategies = {}
+    for strategy in report["strategies"].values():
+        strategies[strategy] = strategies.get(strategy, 0) + 1
+    published = ", ".join(f"{count} {strategy}" for strategy, count in sorted(strategies.items()))
+    if not args.skip_static:
+        logger.info(f"Static files synced: {len(report['copied'])} copied{f' ({published})' if published else ''}, "
+                    f"{len(report['removed'])} removed, {len(report['unchanged'])} unchanged")
+    if metrics is not None:
+        metrics.add_phase("static_sync", time.perf_counter() - static_start)
+        for action in ("copied", "removed", "unchanged"):
+            metrics.count(f"static_{action}", len(report[action]))
+        for strategy, count in strategies.items():
+            metrics.count(f"static_published_{strategy}", count)
     
     #generating Page
-    generate_pages_recursive(content_file, template_file, public_dir, basepath)
-    #print(f"Replacing href/src with basepath: {basepath}")
-    print("page generated in docs folder")
-
+    pages_start = time.perf_counter()
+    # pages linking to a static file that was just copied or removed get re-rendered too
+    changed_assets = report["copied"] + report["removed"]
+    build_pages(content_file, template_file, public_dir, basepath, manifest, args.force, args.jobs, metrics,
+                ast_cache, changed_assets, args.io_threads, args.minify, args.only, sources)
+    
+    if metrics is not None:
+        metrics.add_phase("pages", time.perf_counter() - pages_start)
+    
+    # precompressed copies of whatever changed, or none at all so no stale ones get served
+    gzip_start = time.perf_counter()
+    if args.gzip:
+        gzip_report = compress_outputs(public_dir, manifest, args.gzip_level, max(args.jobs, os.cpu_count() or 1))
+        logger.info(f"Gzip sidecars: {len(gzip_report['compressed'])} compressed, "
+                    f"{len(gzip_report['removed'])} removed, {len(gzip_report['unchanged'])} unchanged")
+    else:
+        gzip_report = {"removed": remove_sidecars(public_dir, manifest)}
+        if gzip_report["removed"]:
+            logger.info(f"Removed {len(gzip_report['removed'])} gzip sidecars, --gzip wasn't given")
+    manifest.save()
+    if metrics is not None:
+        metrics.add_phase("gzip", time.perf_counter() - gzip_start)
+        for action, rel_paths in gzip_report.items():
+            metrics.count(f"gzip_{action}", len(rel_paths))
     
-    print("All pages generated in docs folder")
+    logger.info(f"All pages generated in {public_dir} folder in {time.perf_counter() - start:.2f}s")
+    if metrics is not None:
+        metrics.write(args.metrics)
+        logger.info(f"Build metrics written to {args.metrics}")
 
 if __name__ == "__main__":
-    # Get the basepath from command line arguments or default to "/"
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
+    # basepath comes from the command line, defaulting to "/"
     main()
\ No newline at end of file
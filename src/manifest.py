@@ -0,0 +1,137 @@
+import hashlib, json, os
+
+# bump this whenever the layout of the manifest file changes so old ones get ignored
+MANIFEST_VERSION = 1
+
+# where the build keeps its bookkeeping, kept out of docs/ so it never gets published
+DEFAULT_MANIFEST_PATH = os.path.join(".build-cache", "manifest.json")
+
+
+def hash_file(path):
+    # sha256 of the file contents, read in chunks so big files don't sit in memory
+    digest = hashlib.sha256()
+    with open(path, 'rb') as opened_file:
+        for chunk in iter(lambda: opened_file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Remembers what the last build produced so unchanged pages can be skipped.
+
+    For every markdown source it stores the content hash, the html file it was
+    rendered to and the site paths its links and images point at, which doubles as
+    the index of which pages use which static file. The template hash and basepath
+    are stored once for the whole build, since changing either of them changes every
+    page. Static files synced into docs/ are tracked too, so only files we copied
+    ourselves ever get deleted, and so are the .gz sidecars written by --gzip.
+    """
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.template_hash = None
+        self.basepath = None
+        self.pages = {}
+        # static files copied into docs/ by the last sync, keyed by path relative to static/
+        self.assets = {}
+        # files in docs/ with a .gz sidecar, relative to docs/, and the level it was compressed at
+        self.sidecars = {}
+        # set by begin_build when the template or basepath differ from last time
+        self.inputs_changed = True
+        self.seen = set()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            # a broken manifest just means a full rebuild, never a failed one
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.template_hash = data.get("template_hash")
+        self.basepath = data.get("basepath")
+        self.pages = data.get("pages", {})
+        self.assets = data.get("assets", {})
+        self.sidecars = data.get("sidecars", {})
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {
+            "version": MANIFEST_VERSION,
+            "template_hash": self.template_hash,
+            "basepath": self.basepath,
+            "pages": self.pages,
+            "assets": self.assets,
+            "sidecars": self.sidecars,
+        }
+        # write to a temp file first so a crash mid-write can't leave half a manifest behind
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(data, manifest_file, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def begin_build(self, template_hash, basepath, force=False):
+        self.inputs_changed = (force or template_hash != self.template_hash or basepath != self.basepath)
+        self.template_hash = template_hash
+        self.basepath = basepath
+        self.seen = set()
+
+    def is_fresh(self, source_path, source_hash, dest_path):
+        # a page only gets skipped if nothing feeding it changed AND its output is still there
+        self.seen.add(source_path)
+        if self.inputs_changed:
+            return False
+        entry = self.pages.get(source_path)
+        if entry is None:
+            return False
+        return entry["hash"] == source_hash and entry["dest"] == dest_path and os.path.exists(dest_path)
+
+    def record(self, source_path, source_hash, dest_path, refs=()):
+        self.seen.add(source_path)
+        self.pages[source_path] = {"hash": source_hash, "dest": dest_path, "refs": sorted(refs)}
+
+    def invalidate(self, source_paths):
+        # makes these pages look changed to the next build without touching their output,
+        # for partial builds that can't render them now
+        for source_path in source_paths:
+            if source_path in self.pages:
+                self.pages[source_path]["hash"] = None
+
+    def pages_using(self, asset_paths):
+        # sources of every page that links to one of these static/-relative paths
+        asset_paths = {asset_path.replace(os.sep, "/") for asset_path in asset_paths}
+        return sorted(source_path for source_path, entry in self.pages.items()
+                      if not asset_paths.isdisjoint(entry.get("refs", ())))
+
+    def remove_page(self, source_path, dest_root):
+        # forgets a page whose markdown is gone and deletes the html it produced
+        entry = self.pages.pop(source_path, None)
+        if entry is None:
+            return None
+        dest_path = entry["dest"]
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            remove_empty_dirs(os.path.dirname(dest_path), dest_root)
+        return dest_path
+
+    def prune(self, dest_root):
+        # drops every page whose source wasn't seen this build and deletes its output
+        return [self.remove_page(source_path, dest_root) for source_path in sorted(set(self.pages) - self.seen)]
+
+
+def remove_empty_dirs(directory, stop_at):
+    # walks upwards removing directories that became empty, stops at the first non-empty one
+    stop_at = os.path.normpath(stop_at)
+    while directory and os.path.normpath(directory) != stop_at:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
@@ -0,0 +1,136 @@
+import json, time
+from contextlib import contextmanager
+
+# the stages of rendering one page, in the order they happen
+STAGES = ("read", "block_split", "classify", "inline_parse", "serialize", "write")
+
+
+class PageMetrics:
+    """
+    Time spent in each stage of rendering one page, plus counts and byte sizes.
+
+    serialize is exclusive: the time spent inside the writes it triggers is booked
+    under write instead.
+    """
+
+    def __init__(self, source_path):
+        self.source_path = source_path
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.counts = {"blocks": 0, "bytes_in": 0, "bytes_out": 0, "ast_cache_hits": 0}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[name] += time.perf_counter() - start
+
+    def add(self, name, seconds):
+        self.times[name] += seconds
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def total(self):
+        return sum(self.times.values())
+
+    def as_dict(self):
+        return {
+            "source": self.source_path,
+            "total_s": self.total(),
+            "stages_s": dict(self.times),
+            **self.counts,
+        }
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullMetrics:
+    # stands in for PageMetrics when nobody asked for metrics, so the parser doesn't need ifs everywhere
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def add(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsWriter:
+    # wraps the output stream, books the time spent writing per fragment
+    def __init__(self, stream, metrics):
+        self.stream = stream
+        self.metrics = metrics
+
+    def write(self, fragment):
+        start = time.perf_counter()
+        self.stream.write(fragment)
+        self.metrics.add("write", time.perf_counter() - start)
+        # bytes as they land on disk, like bytes_in, not characters
+        self.metrics.count("bytes_out", len(fragment.encode("utf-8")))
+
+
+class BuildMetrics:
+    """
+    Collects PageMetrics for a whole build and writes the --metrics json report.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.pages = []
+        self.phases = {}
+        self.counts = {}
+
+    def add_page(self, page_metrics):
+        self.pages.append(page_metrics)
+
+    def add_phase(self, name, seconds):
+        # build-wide steps that aren't per page, like syncing static/
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def report(self, slowest=20):
+        stages = dict.fromkeys(STAGES, 0.0)
+        for page in self.pages:
+            for name, seconds in page.times.items():
+                stages[name] += seconds
+        ranked = sorted(self.pages, key=lambda page: page.total(), reverse=True)
+        return {
+            "wall_s": time.perf_counter() - self.started,
+            "pages_rendered": len(self.pages),
+            "counts": dict(self.counts),
+            "phases_s": dict(self.phases),
+            "stages_s": stages,
+            "blocks": sum(page.counts["blocks"] for page in self.pages),
+            "bytes_in": sum(page.counts["bytes_in"] for page in self.pages),
+            "bytes_out": sum(page.counts["bytes_out"] for page in self.pages),
+            "ast_cache_hits": sum(page.counts["ast_cache_hits"] for page in self.pages),
+            "slowest_pages": [page.source_path for page in ranked[:slowest]],
+            "pages": [page.as_dict() for page in self.pages],
+        }
+
+    def write(self, path):
+        with open(path, 'w') as metrics_file:
+            json.dump(self.report(), metrics_file, indent=1)
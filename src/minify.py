@@ -0,0 +1,84 @@
+import re
+
+# whitespace html collapses, not \s: a non-breaking space is content
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+
+# elements whose text is shown or run exactly as written
+PRESERVE_TAGS = frozenset(("pre", "code", "textarea", "script", "style"))
+
+# whitespace next to these never shows up on the page, so it can go entirely
+BLOCK_TAGS = frozenset((
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base", "script", "style", "noscript",
+    "article", "aside", "section", "header", "footer", "nav", "main", "div", "p", "blockquote", "pre", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "dl", "dt", "dd", "figure", "figcaption",
+    "table", "thead", "tbody", "tfoot", "tr", "th", "td", "caption", "form", "fieldset", "details", "summary",
+))
+
+# a comment or a tag, quoted attribute values can hold a ">", the tag name is group 2
+TAG_PATTERN = re.compile(r"""<!--.*?-->|<(/?)([a-zA-Z!][^\s/>]*)(?:[^>"']|"[^"]*"|'[^']*')*>""", re.DOTALL)
+
+
+def collapse_whitespace(text):
+    # every run of whitespace in text becomes one space, which is all a browser shows of it
+    return WHITESPACE_PATTERN.sub(" ", text)
+
+
+def minify_html(html):
+    """
+    Drops the whitespace in hand-written html that never reaches the page.
+
+    Runs of whitespace collapse to one space, and disappear completely next to
+    block elements (indentation and newlines around <head>, <meta>, <div> and
+    the like). Comments go, except conditional ones.
+    Everything inside pre, textarea, script and style is kept byte for byte.
+    """
+    parts = []
+    position = 0
+    # text before dropped comments, it joins the text after them
+    pending = []
+    # whether the tag right before the current text is a block element, True at the start
+    after_block = True
+    preserve_until = None
+    for match in TAG_PATTERN.finditer(html):
+        text = html[position:match.start()]
+        tag = match.group(0)
+        name = (match.group(2) or "").lower()
+        position = match.end()
+
+        if preserve_until is not None:
+            # inside pre/script/...: copied as is up to the matching closing tag
+            parts.append(text)
+            parts.append(tag)
+            if match.group(1) and name == preserve_until:
+                preserve_until = None
+                after_block = name in BLOCK_TAGS
+            continue
+
+        if tag.startswith("<!--") and not tag.startswith("<!--[if"):
+            pending.append(text)
+            continue
+        if pending:
+            text = "".join(pending) + text
+            pending = []
+
+        is_block = name in BLOCK_TAGS
+        # a line of text starts and ends at a block's edge, the spaces there aren't shown
+        if after_block:
+            text = text.lstrip(" \t\n\r\f")
+        if is_block:
+            text = text.rstrip(" \t\n\r\f")
+        parts.append(collapse_whitespace(text))
+        parts.append(tag)
+        if tag.startswith("<!--"):
+            # a conditional comment, kept, and it doesn't change what comes before the next tag
+            continue
+        after_block = is_block
+        if not match.group(1) and name in PRESERVE_TAGS and not tag.endswith("/>"):
+            preserve_until = name
+
+    text = "".join(pending) + html[position:]
+    if preserve_until is not None:
+        parts.append(text)
+    else:
+        parts.append(collapse_whitespace(text.lstrip(" \t\n\r\f") if after_block else text))
+    return "".join(parts)
@@ -0,0 +1,154 @@
+import hashlib, io, logging, os, queue, threading, time
+from textnode import *
+from metrics import *
+from astcache import *
+
+logger = logging.getLogger(__name__)
+
+# pages waiting between two stages, per queue
+DEFAULT_PIPELINE_DEPTH = 16
+
+# marks the end of a queue
+_DONE = object()
+
+
+def put_unless_stopped(item_queue, item, stop):
+    # a blocking put that gives up once the build is being torn down, so a stage
+    # stuck on a full queue can't outlive a failed build
+    while not stop.is_set():
+        try:
+            item_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class PagePipeline:
+    """
+    Renders pages with reading, parsing and writing overlapped, for builds that
+    mostly wait on the filesystem.
+
+    A reader thread prefetches markdown files, the calling thread parses and
+    serializes them, and a pool of writer threads creates the directories and
+    writes the html. The stages are connected by queues of at most depth pages, so
+    a slow stage makes the others wait instead of piling pages up in memory. Pages
+    over max_source_bytes are never held in memory: the parse stage streams them
+    from and to disk itself, like generate_page.
+    """
+
+    def __init__(self, template, basepath, writers=4, depth=DEFAULT_PIPELINE_DEPTH, ast_cache=None,
+                 max_source_bytes=DEFAULT_MAX_SOURCE_BYTES):
+        self.template = template
+        self.basepath = basepath
+        self.writers = max(1, writers)
+        self.depth = max(1, depth)
+        self.ast_cache = ast_cache
+        self.max_source_bytes = ast_cache.max_source_bytes if ast_cache is not None else max_source_bytes
+        self.stop = None
+        # errors the reader or a writer hit, the first one is re-raised on the calling thread
+        self.errors = []
+
+    def read_pages(self, pages, read_queue):
+        try:
+            for source_path, dest_path in pages:
+                source_size = os.path.getsize(source_path)
+                data = None
+                start = time.perf_counter()
+                if source_size <= self.max_source_bytes:
+                    with open(source_path, 'rb') as source_file:
+                        data = source_file.read()
+                item = (source_path, dest_path, source_size, data, time.perf_counter() - start)
+                if not put_unless_stopped(read_queue, item, self.stop):
+                    return
+        except Exception as error:
+            self.errors.append(error)
+        put_unless_stopped(read_queue, _DONE, self.stop)
+
+    def write_pages(self, write_queue):
+        # keeps draining after an error so the parse stage never blocks on a full queue
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                return
+            if self.errors:
+                continue
+            dest_path, html, metrics = item
+            start = time.perf_counter()
+            # same temp file and rename as generate_page, a failed write keeps the previous output
+            temp_path = f"{dest_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                with open(temp_path, 'w') as dest_file:
+                    dest_file.write(html)
+                os.replace(temp_path, dest_path)
+            except Exception as error:
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                self.errors.append(error)
+                continue
+            if metrics is not None:
+                metrics.add("write", time.perf_counter() - start)
+                metrics.count("bytes_out", len(html.encode("utf-8")))
+            logger.debug("Page successfully generated at %s", dest_path)
+
+    def render_page(self, source_path, source_size, data, metrics, source_hash, refs):
+        # parses prefetched markdown into the finished html string, the writer books the write
+        if self.ast_cache is not None and source_hash is None:
+            source_hash = hashlib.sha256(data).hexdigest()
+        # decoded and newline-translated exactly like open(path, 'r') would
+        source_file = io.TextIOWrapper(io.BytesIO(data))
+        return render_page_html(source_file, source_path, source_size, self.template, self.basepath, metrics,
+                                self.ast_cache, source_hash, refs)
+
+    def run(self, pages, metrics=None, source_hashes=None):
+        # renders (source, dest) pairs, returns source -> the site paths that page links to
+        # with a BuildMetrics every page's PageMetrics is collected into it
+        if source_hashes is None:
+            source_hashes = {}
+        self.stop = threading.Event()
+        self.errors = []
+        read_queue = queue.Queue(maxsize=self.depth)
+        write_queue = queue.Queue(maxsize=self.depth)
+        reader = threading.Thread(target=self.read_pages, args=(pages, read_queue), daemon=True)
+        writers = [threading.Thread(target=self.write_pages, args=(write_queue,), daemon=True)
+                   for _ in range(self.writers)]
+        reader.start()
+        for writer in writers:
+            writer.start()
+
+        page_refs = {}
+        try:
+            while True:
+                item = read_queue.get()
+                if item is _DONE or self.errors:
+                    break
+                source_path, dest_path, source_size, data, read_seconds = item
+                logger.debug("Generating page from %s to %s", source_path, dest_path)
+                page_metrics = None
+                if metrics is not None:
+                    page_metrics = PageMetrics(source_path)
+                    page_metrics.add("read", read_seconds)
+                refs = set()
+                if data is None:
+                    # too big to hold, streamed on this thread instead
+                    generate_page(source_path, self.template, dest_path, self.basepath, page_metrics,
+                                  self.ast_cache, source_hashes.get(source_path), refs)
+                else:
+                    html = self.render_page(source_path, source_size, data, page_metrics,
+                                            source_hashes.get(source_path), refs)
+                    write_queue.put((dest_path, html, page_metrics))
+                page_refs[source_path] = sorted(refs)
+                if metrics is not None:
+                    metrics.add_page(page_metrics)
+        finally:
+            # unblocks the reader if parsing failed, then lets the writers finish what's queued
+            self.stop.set()
+            for writer in writers:
+                write_queue.put(_DONE)
+            for writer in writers:
+                writer.join()
+            reader.join()
+        if self.errors:
+            raise self.errors[0]
+        return page_refs
@@ -0,0 +1,206 @@
+import email.utils, hashlib, io, logging, os, threading, time
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import urlsplit
+from textnode import *
+from serve import *
+
+logger = logging.getLogger(__name__)
+
+# rendered pages kept in memory, least recently requested ones go first
+DEFAULT_PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
+# how often a long running preview trims the on-disk ASTCache back to its size, like a build does at its end
+AST_EVICT_INTERVAL = 60.0
+
+
+class RenderedPage:
+    # one page as it was last rendered, and what it was rendered from
+    __slots__ = ("source_path", "signature", "source_hash", "template", "html", "etag", "mtime_ns",
+                 "last_modified")
+
+    def __init__(self, source_path, signature, source_hash, template, template_mtime_ns, html):
+        self.source_path = source_path
+        self.signature = signature
+        self.source_hash = source_hash
+        self.template = template
+        self.html = html
+        self.etag = f'"{hashlib.sha256(html).hexdigest()[:32]}"'
+        # a new template changes the page as much as new markdown does
+        self.mtime_ns = max(signature[0], template_mtime_ns)
+        self.last_modified = email.utils.formatdate(self.mtime_ns / 1e9, usegmt=True)
+
+
+class PreviewPages:
+    """
+    Renders pages straight from content/ when they are requested, without a build.
+
+    /blog/tom/ is content/blog/tom/index.md, /notes.html is content/notes.md, like
+    a build would lay them out. A rendered page stays in an LRU cache until its
+    markdown or the template changes: a changed mtime or size alone only costs
+    hashing the markdown again, the page is re-rendered only when the hash differs
+    too. Parses go through the ASTCache when there is one, so even a first request
+    after a restart usually skips parsing.
+    """
+
+    def __init__(self, content_dir, template_path, prefix="/", ast_cache=None, minify=False,
+                 max_bytes=DEFAULT_PREVIEW_CACHE_BYTES):
+        self.content_dir = os.path.realpath(content_dir)
+        self.template_path = template_path
+        # urls in the pages carry the prefix, same as a build for that basepath
+        self.urls = SiteFiles(content_dir, prefix)
+        self.basepath = self.urls.prefix
+        self.ast_cache = ast_cache
+        self.minify = minify
+        self.max_bytes = max_bytes
+        self.pages = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.evicted_at = time.monotonic()
+
+    def source_for(self, url_path):
+        # (markdown path, None), (None, redirect url) or (None, None) when no page has this url
+        if url_path + "/" == self.basepath:
+            return None, self.basepath
+        rel_path = self.urls.site_path(url_path)
+        if rel_path is None:
+            return None, None
+        path = os.path.join(self.content_dir, *rel_path.split("/"))
+        if rel_path == "" or rel_path.endswith("/"):
+            path = os.path.join(path, "index.md")
+        elif rel_path.endswith(".html"):
+            path = path[:-5] + ".md"
+        elif os.path.isfile(os.path.join(path, "index.md")):
+            return None, url_path + "/"
+        else:
+            return None, None
+        real_path = os.path.realpath(path)
+        if not real_path.startswith(self.content_dir + os.sep) or not os.path.isfile(real_path):
+            return None, None
+        return real_path, None
+
+    def lookup(self, url_path):
+        # (RenderedPage, None), (None, redirect url) or (None, None), rendering the page if needed
+        source_path, redirect = self.source_for(url_path)
+        if source_path is None:
+            return None, redirect
+
+        template = load_template(self.template_path, self.basepath, self.minify)
+        stat = os.stat(source_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            page = self.pages.get(source_path)
+            if page is not None:
+                self.pages.move_to_end(source_path)
+        if page is not None and page.template is template and page.signature == signature:
+            return page, None
+
+        with open(source_path, 'rb') as source_file:
+            data = source_file.read()
+        source_hash = hashlib.sha256(data).hexdigest()
+        if page is not None and page.template is template and page.source_hash == source_hash:
+            # touched or saved without changes
+            page.signature = signature
+            return page, None
+
+        logger.info("Rendering %s", os.path.relpath(source_path, self.content_dir))
+        # decoded and newline-translated exactly like a build would read it
+        html = render_page_html(io.TextIOWrapper(io.BytesIO(data)), source_path, len(data), template,
+                                self.basepath, ast_cache=self.ast_cache, source_hash=source_hash)
+        template_mtime_ns = os.stat(self.template_path).st_mtime_ns
+        page = RenderedPage(source_path, signature, source_hash, template, template_mtime_ns, html.encode("utf-8"))
+        self.store(page)
+        self.evict_ast_cache()
+        return page, None
+
+    def evict_ast_cache(self, force=False):
+        # keeps the on-disk parses within --ast-cache-size, at most every AST_EVICT_INTERVAL
+        # seconds unless forced, and by one thread while the others carry on serving
+        with self.lock:
+            if self.ast_cache is None or (not force and time.monotonic() - self.evicted_at < AST_EVICT_INTERVAL):
+                return
+            self.evicted_at = time.monotonic()
+        self.ast_cache.evict()
+
+    def store(self, page):
+        with self.lock:
+            previous = self.pages.pop(page.source_path, None)
+            if previous is not None:
+                self.size -= len(previous.html)
+            self.pages[page.source_path] = page
+            self.size += len(page.html)
+            while self.size > self.max_bytes and len(self.pages) > 1:
+                source_path, evicted = self.pages.popitem(last=False)
+                self.size -= len(evicted.html)
+
+
+class PreviewHandler(StaticHandler):
+    # pages rendered on request, anything else is a file from static/
+    def send_file(self, head_only, retry=True):
+        url_path = urlsplit(self.path).path
+        try:
+            page, redirect = self.server.pages.lookup(url_path)
+        except Exception as error:
+            # a half-typed page shouldn't take the preview down
+            logger.error(f"Failed to render {url_path}: {error}")
+            self.send_server_error(error, head_only)
+            return
+        if redirect is not None:
+            self.send_redirect(redirect)
+            return
+        if page is None:
+            super().send_file(head_only, retry)
+            return
+
+        if not_modified(self.headers, page.mtime_ns, page.etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_page_validators(page)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page.html)))
+        self.send_page_validators(page)
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(page.html)
+
+    def send_page_validators(self, page):
+        self.send_header("ETag", page.etag)
+        self.send_header("Last-Modified", page.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+
+    def send_server_error(self, error, head_only):
+        body = f"500 Internal Server Error\n\n{error}\n".encode("utf-8")
+        self.send_response(HTTPStatus.INTERNAL_SERVER_ERROR)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+
+class PreviewServer(ThreadingHTTPServer):
+    # serve's StaticServer, with the pages coming from content/ instead of docs/
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, content_dir, static_dir, template_path, prefix="/", ast_cache=None, minify=False,
+                 max_bytes=DEFAULT_PREVIEW_CACHE_BYTES):
+        self.pages = PreviewPages(content_dir, template_path, prefix, ast_cache, minify, max_bytes)
+        self.site = SiteFiles(static_dir, prefix)
+        super().__init__(address, PreviewHandler)
+
+
+def preview(content_dir, static_dir, template_path, prefix="/", host="", port=DEFAULT_PORT, ast_cache=None,
+            minify=False):
+    # serves the site without building it until interrupted
+    server = PreviewServer((host, port), content_dir, static_dir, template_path, prefix, ast_cache, minify)
+    logger.info(f"Previewing {content_dir} at http://{host or 'localhost'}:{server.server_address[1]}"
+                f"{server.site.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped previewing")
+    finally:
+        server.server_close()
+        server.pages.evict_ast_cache(force=True)
@@ -0,0 +1,63 @@
+import os
+
+
+def walk_files(root, suffix=None, keep_dir=None, keep_file=None, missing_ok=False):
+    """
+    Yields (rel_path, DirEntry) for every file under root, in no particular order.
+
+    One os.scandir per directory and an explicit stack instead of recursion: the
+    entry types come from the directory listing itself, so telling files from
+    directories costs no stat() per entry, and deep trees can't hit the recursion
+    limit. keep_dir and keep_file get root-relative paths and can skip a whole
+    subtree or a single file before anything else is done with it. Symlinked
+    directories are entered like real ones, but never one that is already among
+    the directories leading to it, so a link pointing back up can't loop forever.
+    With missing_ok a missing root is just an empty tree, directories vanishing
+    mid-walk always are.
+    """
+    try:
+        root_stat = os.stat(root)
+    except FileNotFoundError:
+        if missing_ok:
+            return
+        raise
+    # every directory carries the (st_dev, st_ino) of itself and its parents
+    stack = [("", frozenset([(root_stat.st_dev, root_stat.st_ino)]))]
+    while stack:
+        rel_dir, ancestors = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+        except (FileNotFoundError, NotADirectoryError):
+            if rel_dir or missing_ok:
+                continue
+            raise
+        with entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    continue
+                if is_dir:
+                    if keep_dir is not None and not keep_dir(rel_path):
+                        continue
+                    try:
+                        # one stat per directory, files still only need the listing
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    identity = (stat.st_dev, stat.st_ino)
+                    if identity in ancestors:
+                        continue
+                    stack.append((rel_path, ancestors | {identity}))
+                    continue
+                if suffix is not None and not entry.name.endswith(suffix):
+                    continue
+                if keep_file is not None and not keep_file(rel_path):
+                    continue
+                yield rel_path, entry
+
+
+def scan_files(root, suffix=None, keep_dir=None, keep_file=None, missing_ok=False):
+    # sorted root-relative paths of walk_files, the same order on every run and every filesystem
+    return sorted(rel_path for rel_path, entry in walk_files(root, suffix, keep_dir, keep_file, missing_ok))
@@ -0,0 +1,290 @@
+import email.utils, logging, mimetypes, os, posixpath, time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8000
+# how long a file's metadata is trusted before it is stat()ed again, short enough to
+# pick up a rebuild running next to the server
+DEFAULT_METADATA_TTL = 1.0
+# smaller files are written from python, the syscalls of sendfile don't pay off below this
+SENDFILE_MIN_BYTES = 64 * 1024
+
+
+class FileInfo:
+    # what a response needs to know about one file in docs/, computed once per version of the file
+    __slots__ = ("path", "size", "mtime_ns", "etag", "last_modified", "content_type", "gzip_path", "gzip_size",
+                 "gzip_signature", "checked")
+
+    def __init__(self, path, stat, gzip_stat=None):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        content_type, encoding = mimetypes.guess_type(path)
+        if content_type is None:
+            content_type = "application/octet-stream"
+        elif content_type.startswith("text/") or content_type in ("application/javascript", "application/json"):
+            content_type += "; charset=utf-8"
+        self.content_type = content_type
+        # a --gzip sidecar only counts while it carries the original's mtime, see gzip_file
+        self.gzip_path = None
+        self.gzip_size = None
+        self.gzip_signature = file_signature(gzip_stat)
+        if gzip_stat is not None and gzip_stat.st_mtime_ns == stat.st_mtime_ns:
+            self.gzip_path = path + ".gz"
+            self.gzip_size = gzip_stat.st_size
+        self.checked = time.monotonic()
+
+    def is_current(self, stat, gzip_stat):
+        return (stat.st_mtime_ns, stat.st_size) == (self.mtime_ns, self.size) \
+            and file_signature(gzip_stat) == self.gzip_signature
+
+
+def file_signature(stat):
+    return None if stat is None else (stat.st_mtime_ns, stat.st_size)
+
+
+class SiteFiles:
+    """
+    Maps url paths onto files in a built site and caches what it learns about them.
+
+    A cached entry is reused without touching the disk for ttl seconds, after that one
+    stat() tells whether the file changed. Entries are keyed by the normalized path a
+    url resolves to, not the url itself, and only files that exist are cached, so
+    random urls (or every alias of one file) can't grow the cache past the size of
+    the site.
+    """
+
+    def __init__(self, root, prefix="/", ttl=DEFAULT_METADATA_TTL):
+        self.root = os.path.realpath(root)
+        # the basepath the site was built for, stripped from every url
+        self.prefix = prefix if prefix.endswith("/") else prefix + "/"
+        self.ttl = ttl
+        self.entries = {}
+
+    def site_path(self, url_path):
+        # the url path relative to the site root, None when it's outside the prefix or the site
+        if not url_path.startswith(self.prefix):
+            return None
+        rel_path = posixpath.normpath(unquote(url_path[len(self.prefix):]) or ".")
+        if rel_path == ".":
+            return ""
+        if rel_path.startswith("../") or rel_path == ".." or "\x00" in rel_path:
+            return None
+        return rel_path.lstrip("/") + ("/" if url_path.endswith("/") else "")
+
+    def lookup(self, url_path):
+        # (FileInfo, None) for a file, (None, redirect url) for a directory asked for
+        # without its trailing slash, (None, None) when there's nothing
+        if url_path + "/" == self.prefix:
+            return None, self.prefix
+        rel_path = self.site_path(url_path)
+        if rel_path is None:
+            return None, None
+        key = self.cache_key(rel_path)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < self.ttl:
+            return entry, None
+
+        path = os.path.join(self.root, *rel_path.split("/"))
+        if rel_path == "" or rel_path.endswith("/"):
+            path = os.path.join(path, "index.html")
+        elif os.path.isdir(path):
+            if os.path.isfile(os.path.join(path, "index.html")):
+                return None, url_path + "/"
+            return None, None
+        real_path = os.path.realpath(path)
+        if real_path != self.root and not real_path.startswith(self.root + os.sep):
+            # a symlink pointing out of the site
+            return None, None
+        try:
+            stat = os.stat(real_path)
+        except OSError:
+            self.entries.pop(key, None)
+            return None, None
+        if not os.path.isfile(real_path):
+            return None, None
+
+        try:
+            gzip_stat = os.stat(real_path + ".gz")
+        except OSError:
+            gzip_stat = None
+
+        if entry is not None and entry.is_current(stat, gzip_stat):
+            entry.checked = now
+            return entry, None
+        entry = FileInfo(real_path, stat, gzip_stat)
+        self.entries[key] = entry
+        return entry, None
+
+    def cache_key(self, rel_path):
+        # /blog/ and /blog/index.html are one file, so one entry
+        return rel_path + "index.html" if rel_path == "" or rel_path.endswith("/") else rel_path
+
+    def forget(self, url_path):
+        # drops the cached entry behind url_path, for files that changed under a response
+        rel_path = self.site_path(url_path)
+        if rel_path is not None:
+            self.entries.pop(self.cache_key(rel_path), None)
+
+
+def accepts_gzip(accept_encoding):
+    # gzip (or *) listed in Accept-Encoding without q=0
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        return quality > 0
+    return False
+
+
+def not_modified(headers, mtime_ns, etag):
+    # conditional GET: If-None-Match wins over If-Modified-Since when both are sent
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or ("W/" + etag) in tags
+    if_modified_since = headers.get("If-Modified-Since")
+    if if_modified_since is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        return mtime_ns // 1_000_000_000 <= since
+    return False
+
+
+class StaticHandler(BaseHTTPRequestHandler):
+    # serves the files of server.site, GET and HEAD only
+    protocol_version = "HTTP/1.1"
+    server_version = "StaticSiteServer"
+    # headers and body are separate writes, with Nagle every keep-alive response waits on a delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_file(head_only=False)
+
+    def do_HEAD(self):
+        self.send_file(head_only=True)
+
+    def send_file(self, head_only, retry=True):
+        url_path = urlsplit(self.path).path
+        entry, redirect = self.server.site.lookup(url_path)
+        if redirect is not None:
+            self.send_redirect(redirect)
+            return
+        if entry is None:
+            self.send_not_found(head_only)
+            return
+
+        use_gzip = entry.gzip_path is not None and accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        path, size, etag = entry.path, entry.size, entry.etag
+        if use_gzip:
+            path, size, etag = entry.gzip_path, entry.gzip_size, etag[:-1] + '-gz"'
+
+        if not_modified(self.headers, entry.mtime_ns, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_validators(entry, etag)
+            self.end_headers()
+            return
+
+        try:
+            body = open(path, 'rb')
+        except OSError:
+            # deleted since it was cached
+            self.server.site.forget(url_path)
+            self.send_not_found(head_only)
+            return
+        body_stat = os.fstat(body.fileno())
+        if (body_stat.st_mtime_ns, body_stat.st_size) != (entry.mtime_ns, size) and retry:
+            # rebuilt within the ttl, the cached length and etag would be wrong
+            body.close()
+            self.server.site.forget(url_path)
+            self.send_file(head_only, retry=False)
+            return
+        with body:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", entry.content_type)
+            self.send_header("Content-Length", str(size))
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_validators(entry, etag)
+            self.end_headers()
+            if head_only:
+                return
+            if size >= SENDFILE_MIN_BYTES:
+                # straight from the page cache into the socket, sendfile() where the os has it
+                self.wfile.flush()
+                self.connection.sendfile(body, 0, size)
+            else:
+                self.wfile.write(body.read(size))
+
+    def send_redirect(self, location):
+        query = urlsplit(self.path).query
+        self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+        self.send_header("Location", location + ("?" + query if query else ""))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def send_validators(self, entry, etag):
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        if entry.gzip_path is not None:
+            self.send_header("Vary", "Accept-Encoding")
+
+    def send_not_found(self, head_only):
+        body = b"404 Not Found\n"
+        self.send_response(HTTPStatus.NOT_FOUND)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # one line per request is a lot under load, only with -v
+        logger.debug("%s " + format, self.address_string(), *args)
+
+
+class StaticServer(ThreadingHTTPServer):
+    """
+    Threaded http server for a built site, a request per thread with keep-alive.
+
+    Compared to python -m http.server: metadata is cached (see SiteFiles), responses
+    carry ETag and Last-Modified and answer conditional requests with 304, --gzip
+    sidecars are sent to clients accepting gzip, and big files go out with sendfile.
+    """
+
+    daemon_threads = True
+    # http.server's default of 5 drops connections under a burst of requests
+    request_queue_size = 128
+
+    def __init__(self, address, root, prefix="/", ttl=DEFAULT_METADATA_TTL):
+        self.site = SiteFiles(root, prefix, ttl)
+        super().__init__(address, StaticHandler)
+
+
+def serve(root, prefix="/", host="", port=DEFAULT_PORT):
+    # serves root until interrupted, prefix is the basepath the site was built with
+    server = StaticServer((host, port), root, prefix)
+    logger.info(f"Serving {root} at http://{host or 'localhost'}:{server.server_address[1]}{server.site.prefix}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopped serving")
+    finally:
+        server.server_close()
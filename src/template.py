@@ -0,0 +1,88 @@
+import os, re
+from minify import *
+
+# {{ Title }}, {{ Content }}, {{ anything_else }}
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# root-relative href/src attributes in the template's own markup
+ROOT_LINK_PATTERN = re.compile(r'\b(href|src)="/(?!/)')
+
+
+class Template:
+    """
+    A template.html parsed once into literal segments and named slots.
+
+    literals always has one more entry than slots, rendering just interleaves them:
+    literals[0] + slot 0 + literals[1] + slot 1 + ... + literals[-1]
+
+    Root-relative href/src links in the literals get the basepath at compile time,
+    slot values are expected to carry resolved urls already.
+
+    A minified template has the whitespace stripped from its own markup here, once,
+    and has html node slot values serialize minified too (see minify_html).
+    """
+
+    def __init__(self, text, basepath="/", minify=False):
+        if basepath != "/":
+            text = ROOT_LINK_PATTERN.sub(lambda match: f'{match.group(1)}="{basepath}', text)
+        if minify:
+            text = minify_html(text)
+        self.minify = minify
+        self.literals = []
+        # (name, raw) pairs, raw is the original "{{ name }}" text for slots nobody fills
+        self.slots = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.literals.append(text[position:match.start()])
+            self.slots.append((match.group(1), match.group(0)))
+            position = match.end()
+        self.literals.append(text[position:])
+
+    def slot_names(self):
+        return [name for name, raw in self.slots]
+
+    def render(self, values):
+        # one join over precomputed pieces instead of a str.replace pass per placeholder
+        parts = [self.literals[0]]
+        for index, (name, raw) in enumerate(self.slots):
+            # unknown slots are left exactly as written, same as the old str.replace did
+            parts.append(values.get(name, raw))
+            parts.append(self.literals[index + 1])
+        return "".join(parts)
+
+    def write(self, stream, values):
+        # same as render but streams into a file-like object, slot values that are
+        # html nodes get serialized straight into the stream
+        stream.write(self.literals[0])
+        for index, (name, raw) in enumerate(self.slots):
+            value = values.get(name, raw)
+            if isinstance(value, str):
+                stream.write(value)
+            elif self.minify:
+                value.write_html(stream, True)
+            else:
+                value.write_html(stream)
+            stream.write(self.literals[index + 1])
+
+    def __eq__(self, other):
+        if isinstance(other, Template):
+            return self.literals == other.literals and self.slots == other.slots and self.minify == other.minify
+        return False
+
+    def __repr__(self):
+        return f"Template(slots={self.slot_names()})"
+
+
+# compiled templates keyed by path, basepath and minify, reused until the file's mtime or size changes
+_template_cache = {}
+
+def load_template(template_path, basepath="/", minify=False):
+    stat = os.stat(template_path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_cache.get((template_path, basepath, minify))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with open(template_path, 'r') as open_template:
+        template = Template(open_template.read(), basepath, minify)
+    _template_cache[(template_path, basepath, minify)] = (key, template)
+    return template
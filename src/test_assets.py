@@ -0,0 +1,166 @@
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from assets import *
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.temp_dir.name, "static")
+        self.target = os.path.join(self.temp_dir.name, "docs")
+        self.manifest = BuildManifest(os.path.join(self.temp_dir.name, "manifest.json"))
+        self.write(self.src, "index.css", "body {}")
+        self.write(self.src, "images/tom.png", "png bytes")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, root, rel_path, text):
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as opened_file:
+            opened_file.write(text)
+        return path
+
+    def test_first_sync_copies_everything_with_mtimes(self):
+        report = sync_static(self.src, self.target, self.manifest)
+        self.assertEqual(report["copied"], ["images/tom.png", "index.css"])
+        self.assertEqual(
+            os.stat(os.path.join(self.src, "index.css")).st_mtime_ns,
+            os.stat(os.path.join(self.target, "index.css")).st_mtime_ns,
+        )
+
+    def test_second_sync_copies_nothing(self):
+        sync_static(self.src, self.target, self.manifest)
+        report = sync_static(self.src, self.target, self.manifest)
+        self.assertEqual(report["copied"], [])
+        self.assertEqual(report["removed"], [])
+        self.assertEqual(report["unchanged"], ["images/tom.png", "index.css"])
+
+    def test_changed_file_is_copied(self):
+        sync_static(self.src, self.target, self.manifest)
+        css_path = self.write(self.src, "index.css", "body { color: red }")
+        os.utime(css_path, ns=(1, 1))
+        report = sync_static(self.src, self.target, self.manifest)
+        self.assertEqual(report["copied"], ["index.css"])
+        with open(os.path.join(self.target, "index.css")) as opened_file:
+            self.assertEqual(opened_file.read(), "body { color: red }")
+
+    def test_removed_source_is_deleted_but_pages_are_kept(self):
+        sync_static(self.src, self.target, self.manifest)
+        page_path = self.write(self.target, "index.html", "<html></html>")
+        os.remove(os.path.join(self.src, "images/tom.png"))
+        report = sync_static(self.src, self.target, self.manifest)
+        self.assertEqual(report["removed"], ["images/tom.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.target, "images")))
+        self.assertTrue(os.path.exists(page_path))
+
+    def test_checksum_skips_touched_but_identical_file(self):
+        sync_static(self.src, self.target, self.manifest)
+        css_path = os.path.join(self.src, "index.css")
+        os.utime(css_path, ns=(5, 5))
+        report = sync_static(self.src, self.target, self.manifest, use_hash=True)
+        self.assertEqual(report["copied"], [])
+        self.assertEqual(os.stat(os.path.join(self.target, "index.css")).st_mtime_ns, 5)
+
+    def test_files_under_symlinked_directories_are_synced(self):
+        # a wipe and copy always published these, a sync has to as well
+        shared = os.path.join(self.temp_dir.name, "shared")
+        self.write(shared, "fonts/a.woff", "font")
+        try:
+            os.symlink(shared, os.path.join(self.src, "shared"))
+        except (OSError, NotImplementedError):
+            self.skipTest("no symlinks here")
+        report = sync_static(self.src, self.target, self.manifest)
+        self.assertEqual(report["copied"], ["images/tom.png", "index.css", "shared/fonts/a.woff"])
+        with open(os.path.join(self.target, "shared", "fonts", "a.woff")) as opened_file:
+            self.assertEqual(opened_file.read(), "font")
+
+
+class TestPublishFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.src_path = os.path.join(self.temp_dir.name, "tom.png")
+        with open(self.src_path, 'wb') as src_file:
+            src_file.write(b"png bytes" * 1000)
+        os.utime(self.src_path, ns=(5, 5))
+        self.target_path = os.path.join(self.temp_dir.name, "published.png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def assertPublished(self):
+        with open(self.src_path, 'rb') as src_file, open(self.target_path, 'rb') as target_file:
+            self.assertEqual(src_file.read(), target_file.read())
+        self.assertEqual(os.stat(self.target_path).st_mtime_ns, 5)
+        # no temp files left behind
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)), ["published.png", "tom.png"])
+
+    def test_publish_chain(self):
+        self.assertEqual(publish_chain("hardlink"), ("hardlink", "copy_range", "copy"))
+        self.assertEqual(publish_chain("copy"), ("copy",))
+        with self.assertRaises(ValueError):
+            publish_chain("teleport")
+
+    def test_every_strategy_publishes_the_same_file(self):
+        for strategy in ("copy", "copy_range", "hardlink", "reflink"):
+            # reflinks depend on the filesystem, falling back is fine
+            used = publish_file(self.src_path, self.target_path, publish_chain(strategy))
+            self.assertIn(used, publish_chain(strategy))
+            self.assertPublished()
+            self.assertEqual(os.path.samefile(self.src_path, self.target_path), used == "hardlink")
+            os.remove(self.target_path)
+
+    def test_falls_back_when_a_strategy_fails(self):
+        with mock.patch.dict(PUBLISHERS, hardlink=mock.Mock(side_effect=OSError(errno.EXDEV, "cross device"))):
+            self.assertEqual(publish_file(self.src_path, self.target_path, ("hardlink", "copy")), "copy")
+        self.assertPublished()
+
+    def test_last_strategy_failing_raises(self):
+        with mock.patch.dict(PUBLISHERS, copy=mock.Mock(side_effect=OSError(errno.EACCES, "denied"))):
+            with self.assertRaises(OSError):
+                publish_file(self.src_path, self.target_path, ("copy",))
+        self.assertFalse(os.path.exists(self.target_path))
+
+    def test_short_copy_is_not_published(self):
+        # the source "ends" after 3 bytes for copy_range, shutil.copy2's own sendfile calls go through
+        short = [3, 0, 3, 0]
+        real_sendfile = os.sendfile
+
+        def sendfile(*args):
+            return short.pop(0) if short else real_sendfile(*args)
+
+        with mock.patch("os.copy_file_range", return_value=0, create=True), mock.patch("os.sendfile", sendfile):
+            with self.assertRaises(OSError):
+                copy_range_file(self.src_path, self.target_path)
+            self.assertEqual(publish_file(self.src_path, self.target_path, ("copy_range", "copy")), "copy")
+        self.assertPublished()
+
+    @unittest.skipIf(fcntl is None, "no fcntl")
+    def test_unsupported_reflinks_are_remembered(self):
+        reflink_unsupported.clear()
+        self.addCleanup(reflink_unsupported.clear)
+        with mock.patch("fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, "not supported")) as ioctl:
+            for _ in range(3):
+                self.assertEqual(publish_file(self.src_path, self.target_path, ("reflink", "copy")), "copy")
+        self.assertEqual(ioctl.call_count, 1)
+        self.assertPublished()
+
+    def test_sync_reports_strategies(self):
+        src = os.path.join(self.temp_dir.name, "static")
+        os.makedirs(src)
+        os.replace(self.src_path, os.path.join(src, "tom.png"))
+        manifest = BuildManifest(os.path.join(self.temp_dir.name, "manifest.json"))
+        report = sync_static(src, os.path.join(self.temp_dir.name, "docs"), manifest, publish="hardlink")
+        self.assertEqual(report["strategies"], {"tom.png": "hardlink"})
+        report = sync_static(src, os.path.join(self.temp_dir.name, "docs"), manifest, publish="hardlink")
+        self.assertEqual(report["strategies"], {})
+        self.assertEqual(report["unchanged"], ["tom.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
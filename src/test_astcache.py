@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+from textnode import *
+from astcache import *
+
+
+class TestASTCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.cache = ASTCache(os.path.join(self.root, "ast"))
+        self.source = os.path.join(self.root, "index.md")
+        with open(self.source, 'w') as source_file:
+            source_file.write("---\nauthor: Tolkien\n---\n# Home\n\nSee [tom](/blog/tom) and ![pic](/images/tom.png)"
+                              "\n\n- one\n- **two**")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, 'w') as template_file:
+            template_file.write('<link href="/index.css"><title>{{ Title }}</title>{{ author }}{{ Content }}')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def render(self, basepath, ast_cache=None):
+        dest = os.path.join(self.root, "out.html")
+        metrics = generate_page(self.source, self.template, dest, basepath, PageMetrics(self.source), ast_cache)
+        with open(dest) as dest_file:
+            return dest_file.read(), metrics
+
+    def test_tree_round_trip_resolves_basepath(self):
+        node = markdown_to_html_node("[tom](/blog/tom) ![pic](/images/tom.png) [out](https://example.com)")
+        data = node_to_data(node)
+        self.assertEqual(node_from_data(data).to_html(), node.to_html())
+        self.assertEqual(
+            node_from_data(data, "/repo/").to_html(),
+            markdown_to_html_node("[tom](/blog/tom) ![pic](/images/tom.png) [out](https://example.com)",
+                                  "/repo/").to_html(),
+        )
+
+    def test_cached_page_renders_the_same(self):
+        uncached, metrics = self.render("/")
+        first, metrics = self.render("/", self.cache)
+        self.assertEqual(metrics.counts["ast_cache_hits"], 0)
+        second, metrics = self.render("/", self.cache)
+        self.assertEqual(metrics.counts["ast_cache_hits"], 1)
+        # nothing was parsed the second time
+        self.assertEqual(metrics.counts["blocks"], 0)
+        self.assertEqual(uncached, first)
+        self.assertEqual(uncached, second)
+
+    def test_basepath_change_reuses_the_parse(self):
+        self.render("/", self.cache)
+        uncached, metrics = self.render("/repo/")
+        cached, metrics = self.render("/repo/", self.cache)
+        self.assertEqual(metrics.counts["ast_cache_hits"], 1)
+        self.assertEqual(cached, uncached)
+        self.assertIn('href="/repo/blog/tom"', cached)
+
+    def test_changed_markdown_misses(self):
+        self.render("/", self.cache)
+        with open(self.source, 'a') as source_file:
+            source_file.write("\n\nMore")
+        html, metrics = self.render("/", self.cache)
+        self.assertEqual(metrics.counts["ast_cache_hits"], 0)
+        self.assertIn("<p>More</p>", html)
+
+    def test_big_pages_are_not_cached(self):
+        cache = ASTCache(os.path.join(self.root, "ast"), max_source_bytes=10)
+        self.render("/", cache)
+        self.assertFalse(os.path.exists(cache.directory))
+
+    def test_broken_entry_is_a_miss(self):
+        self.cache.store("abc", {}, "Title", node_to_data(markdown_to_html_node("hi")))
+        with open(self.cache.entry_path("abc"), 'w') as entry_file:
+            entry_file.write("not a pickle")
+        self.assertIsNone(self.cache.load("abc"))
+
+    def test_evict_drops_least_recently_used(self):
+        tree = node_to_data(markdown_to_html_node("x" * 1000))
+        for index, source_hash in enumerate(["old", "middle", "new"]):
+            self.cache.store(source_hash, {}, "Title", tree)
+            os.utime(self.cache.entry_path(source_hash), ns=(index * 10**9, index * 10**9))
+        # reading an entry makes it the most recently used
+        self.cache.load("old")
+        stale = os.path.join(self.cache.directory, "v0-stale.pickle")
+        open(stale, 'w').close()
+
+        self.cache.max_bytes = os.path.getsize(self.cache.entry_path("new")) * 2
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(sorted(os.listdir(self.cache.directory)),
+                         sorted(os.path.basename(self.cache.entry_path(name)) for name in ["old", "new"]))
+
+    def test_evict_keeps_temp_files_being_written(self):
+        os.makedirs(self.cache.directory, exist_ok=True)
+        writing = os.path.join(self.cache.directory, "writing.tmp")
+        killed = os.path.join(self.cache.directory, "killed.tmp")
+        open(writing, 'w').close()
+        open(killed, 'w').close()
+        os.utime(killed, ns=(1, 1))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertEqual(os.listdir(self.cache.directory), ["writing.tmp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
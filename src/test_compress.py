@@ -0,0 +1,79 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import *
+
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.public = os.path.join(self.temp_dir.name, "docs")
+        self.manifest = BuildManifest(os.path.join(self.temp_dir.name, "manifest.json"))
+        self.write("index.html", "<p>home</p>" * 100)
+        self.write("blog/tom/index.html", "<p>tom</p>" * 100)
+        self.write("index.css", "body {}")
+        self.write("images/tom.png", "png bytes")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, rel_path):
+        return os.path.join(self.public, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), 'w') as opened_file:
+            opened_file.write(text)
+
+    def test_sidecars_for_compressible_files(self):
+        report = compress_outputs(self.public, self.manifest, 6, workers=2)
+        self.assertEqual(report["compressed"], ["blog/tom/index.html", "index.css", "index.html"])
+        self.assertFalse(os.path.exists(self.path("images/tom.png.gz")))
+        with gzip.open(self.path("index.html.gz"), 'rt') as sidecar:
+            self.assertEqual(sidecar.read(), "<p>home</p>" * 100)
+        self.assertEqual(os.stat(self.path("index.html.gz")).st_mtime_ns, os.stat(self.path("index.html")).st_mtime_ns)
+
+    def test_sidecars_are_reproducible(self):
+        compress_outputs(self.public, self.manifest)
+        with open(self.path("index.html.gz"), 'rb') as sidecar:
+            first = sidecar.read()
+        os.remove(self.path("index.html.gz"))
+        compress_outputs(self.public, self.manifest)
+        with open(self.path("index.html.gz"), 'rb') as sidecar:
+            self.assertEqual(sidecar.read(), first)
+
+    def test_only_changed_outputs_are_compressed(self):
+        compress_outputs(self.public, self.manifest)
+        self.write("index.html", "<p>home again</p>")
+        os.utime(self.path("index.html"), ns=(1, 1))
+        report = compress_outputs(self.public, self.manifest)
+        self.assertEqual(report["compressed"], ["index.html"])
+        self.assertEqual(report["unchanged"], ["blog/tom/index.html", "index.css"])
+        # a different level redoes everything
+        report = compress_outputs(self.public, self.manifest, 1)
+        self.assertEqual(len(report["compressed"]), 3)
+
+    def test_stale_sidecars_are_removed(self):
+        compress_outputs(self.public, self.manifest)
+        os.remove(self.path("blog/tom/index.html"))
+        report = compress_outputs(self.public, self.manifest)
+        self.assertEqual(report["removed"], ["blog/tom/index.html"])
+        self.assertFalse(os.path.exists(self.path("blog")))
+
+        self.assertEqual(remove_sidecars(self.public, self.manifest), ["index.css", "index.html"])
+        self.assertFalse(os.path.exists(self.path("index.html.gz")))
+        self.assertTrue(os.path.exists(self.path("index.html")))
+
+    def test_static_gz_files_are_left_alone(self):
+        self.write("index.css.gz", "precompressed by hand")
+        self.manifest.assets["index.css.gz"] = {"size": 21, "mtime_ns": 0}
+        report = compress_outputs(self.public, self.manifest)
+        self.assertNotIn("index.css", report["compressed"])
+        remove_sidecars(self.public, self.manifest)
+        self.assertTrue(os.path.exists(self.path("index.css.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+import io
+import mmap
+import tempfile
 import unittest
 
 from htmlnode import *
@@ -166,6 +169,51 @@ class TestHTMLNode(unittest.TestCase):
         expected = "<div><div><div><div><div><div><div><span>Deep content</span></div></div></div></div></div></div></div>"
         self.assertEqual(level1.to_html(), expected)
         
+    def test_iter_html_fragments(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")], {"class": "x"})
+        self.assertEqual(list(node.iter_html()), ['<p class="x">', "<b>Bold</b>", " text", "</p>"])
+        self.assertEqual(node.to_html(), '<p class="x"><b>Bold</b> text</p>')
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode("div", [
+            ParentNode("ul", [ParentNode("li", [LeafNode("a", "link", {"href": "/x"})])]),
+            LeafNode("img", "", {"src": "/a.png", "alt": "a"}),
+        ])
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(stream.getvalue(), node.to_html())
+
+    def test_write_html_parent_without_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).write_html(io.StringIO())
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_shared_props_are_reused_and_read_only(self):
+        first = shared_props(("href", "/blog/tom"))
+        self.assertIs(first, shared_props(("href", "/blog/tom")))
+        self.assertEqual(first, {"href": "/blog/tom"})
+        with self.assertRaises(TypeError):
+            first["href"] = "/elsewhere"
+        self.assertEqual(LeafNode("a", "Tom", first).to_html(), '<a href="/blog/tom">Tom</a>')
+
+    def test_resolve_url(self):
+        self.assertEqual(resolve_url("/images/tom.png", "/repo/"), "/repo/images/tom.png")
+        self.assertEqual(resolve_url("/images/tom.png", "/"), "/images/tom.png")
+        self.assertEqual(resolve_url("https://boot.dev", "/repo/"), "https://boot.dev")
+        self.assertEqual(resolve_url("//cdn.example.com/a.js", "/repo/"), "//cdn.example.com/a.js")
+        self.assertEqual(resolve_url("relative/page", "/repo/"), "relative/page")
+
+    def test_local_ref(self):
+        self.assertEqual(local_ref("/images/tom.png"), "images/tom.png")
+        self.assertEqual(local_ref("/images/tom%20b.png?v=2#top"), "images/tom b.png")
+        self.assertIsNone(local_ref("/"))
+        self.assertIsNone(local_ref("//cdn.example.com/x.png"))
+        self.assertIsNone(local_ref("https://example.com/x.png"))
+        self.assertIsNone(local_ref("images/tom.png"))
+
     def test_markdown_to_blocks(self):
             md = """
         This is **bolded** paragraph
@@ -288,6 +336,76 @@ class TestHTMLNode(unittest.TestCase):
                 ]
             ) 
     
+class TestIterBlocks(unittest.TestCase):
+    def test_fenced_code_keeps_blank_lines(self):
+        md = "# Title\n\n```\nfirst\n\nsecond\n```\n\nAfter"
+        self.assertEqual(list(iter_blocks(md)), ["# Title", "```\nfirst\n\nsecond\n```", "After"])
+
+    def test_fenced_code_only_loses_fence_indent(self):
+        md = "  ```\n  func main() {\n      fmt.Println()\n  }\n  ```"
+        self.assertEqual(
+            list(iter_blocks(md)),
+            ["```\nfunc main() {\n    fmt.Println()\n}\n```"],
+        )
+
+    def test_fence_starts_its_own_block(self):
+        md = "Some text\n```\ncode\n```\nMore text"
+        self.assertEqual(list(iter_blocks(md)), ["Some text", "```\ncode\n```", "More text"])
+
+    def test_unclosed_fence_runs_to_end(self):
+        md = "```\ncode\n\nmore code"
+        self.assertEqual(list(iter_blocks(md)), ["```\ncode\n\nmore code"])
+
+    def test_file_object_matches_str(self):
+        md = "# Title\n\n- one\n- two\n\n```\nx\n\ny\n```\n"
+        self.assertEqual(list(iter_blocks(io.StringIO(md))), list(iter_blocks(md)))
+        self.assertEqual(list(iter_blocks(io.BytesIO(md.encode()))), list(iter_blocks(md)))
+
+    def test_mmap(self):
+        md = "# Title\n\nÉowyn's paragraph\n"
+        with tempfile.TemporaryFile() as markdown_file:
+            markdown_file.write(md.encode("utf-8"))
+            markdown_file.flush()
+            with mmap.mmap(markdown_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertEqual(list(iter_blocks(mapped)), ["# Title", "Éowyn's paragraph"])
+
+    def test_is_lazy(self):
+        lines = iter(["first", "", "second", ""])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks), "first")
+        # the second block hasn't been read yet
+        self.assertEqual(next(lines), "second")
+
+    def test_split_front_matter_counts_lines(self):
+        lines = ["---", "author: me", "---", "# Title"]
+        self.assertEqual(split_front_matter(lines), ({"author": "me"}, 3))
+        self.assertEqual(split_front_matter(["# Title"]), ({}, 0))
+
+    def test_extract_title_from_lines(self):
+        self.assertEqual(extract_title(io.StringIO("Intro\n# Title\n")), "Title")
+
+class TestClassifyBlock(unittest.TestCase):
+    def test_returns_type_and_lines(self):
+        self.assertEqual(
+            classify_block("- one\n- two"),
+            (BlockType.UNORDERED_LIST, ["- one", "- two"]),
+        )
+        self.assertEqual(
+            classify_block("1. one\n2. two\n3. three"),
+            (BlockType.ORDERED_LIST, ["1. one", "2. two", "3. three"]),
+        )
+        self.assertEqual(classify_block("> quote\n> more"), (BlockType.QUOTE, ["> quote", "> more"]))
+        self.assertEqual(classify_block("### Heading"), (BlockType.HEADING, ["### Heading"]))
+
+    def test_failed_check_is_a_paragraph(self):
+        self.assertEqual(classify_block("- one\ntwo")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("1. one\n3. three")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("####### seven")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("#no space")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("# two\nlines")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("```not closed")[0], BlockType.PARAGRAPH)
+        self.assertEqual(classify_block("")[0], BlockType.PARAGRAPH)
+
 class TestBlockTypeDetection(unittest.TestCase):
     
     def test_paragraph(self):
@@ -652,3 +770,25 @@ class TestExtractTitle(unittest.TestCase):
         super_long_title = "A" * 10000
         self.assertEqual(extract_title(f"# {super_long_title}"), super_long_title)
 
+
+class TestExtractMetadata(unittest.TestCase):
+    def test_no_front_matter(self):
+        md = "# Title\n\nSome text"
+        self.assertEqual(extract_metadata(md), ({}, md))
+
+    def test_front_matter(self):
+        md = "---\nauthor: J.R.R. Tolkien\ndate: 1954-07-29\n---\n# Title"
+        self.assertEqual(
+            extract_metadata(md),
+            ({"author": "J.R.R. Tolkien", "date": "1954-07-29"}, "# Title"),
+        )
+
+    def test_value_with_colon(self):
+        md = "---\nlink: https://example.com\n---\n# Title"
+        self.assertEqual(extract_metadata(md)[0], {"link": "https://example.com"})
+
+    def test_unclosed_or_invalid_front_matter_is_markdown(self):
+        unclosed = "---\nauthor: me\n# Title"
+        self.assertEqual(extract_metadata(unclosed), ({}, unclosed))
+        not_front_matter = "---\njust a line\n---\n# Title"
+        self.assertEqual(extract_metadata(not_front_matter), ({}, not_front_matter))
@@ -0,0 +1,64 @@
+import re
+import time
+import unittest
+
+from linkscan import *
+
+# the patterns LinkScanner replaces, it has to agree with them everywhere
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\(((?:[^()]*|\([^()]*\))*)\)")
+
+
+def spans(match):
+    if match is None:
+        return None
+    return (match.start(), match.end(), match.start(1), match.end(1), match.start(2), match.end(2))
+
+
+class TestLinkScanner(unittest.TestCase):
+    def test_image_and_link(self):
+        text = "see ![pic](/images/tom.png) and [tom](/blog/tom)"
+        scanner = LinkScanner(text)
+        self.assertEqual(list(scanner.iter_images()), [(4, 27, 6, 9, 11, 26)])
+        self.assertEqual(list(scanner.iter_links()), [(32, 48, 33, 36, 38, 47)])
+
+    def test_link_url_with_parens(self):
+        text = "[wiki](https://en.wikipedia.org/wiki/Tom_(Bombadil)) after"
+        match = LinkScanner(text).link_at(0)
+        self.assertEqual(text[match[4]:match[5]], "https://en.wikipedia.org/wiki/Tom_(Bombadil)")
+
+    def test_endpos_bounds_the_link(self):
+        text = "[a](x [b](y) z)"
+        scanner = LinkScanner(text)
+        self.assertEqual(scanner.link_at(0), (0, 15, 1, 2, 4, 14))
+        # with the url cut short the next "](" that still fits is used, like the regex would
+        self.assertEqual(scanner.link_at(0, 12), (0, 12, 1, 8, 10, 11))
+
+    def test_matches_the_old_patterns(self):
+        samples = [
+            "[a](b) ![c](d) [e](f(g)h) [i](j(k)",
+            "![a](b\n) [c\n](d) [e](f\ng)",
+            "[[a](b)](c) ![[x](y)](z) !![a](b)",
+            "[a](b(c)(d)e) [f](g((h)) [i]] (j)",
+            "]([a](", "[](", "![](", "[a]()", "![a]()",
+        ]
+        for text in samples:
+            scanner = LinkScanner(text)
+            for index in range(len(text) + 1):
+                for endpos in (len(text), (index + len(text)) // 2):
+                    self.assertEqual(scanner.image_at(index, endpos), spans(IMAGE_PATTERN.match(text, index, endpos)))
+                    self.assertEqual(scanner.link_at(index, endpos), spans(LINK_PATTERN.match(text, index, endpos)))
+            self.assertEqual(list(scanner.iter_links()), [spans(match) for match in LINK_PATTERN.finditer(text)])
+            self.assertEqual(list(scanner.iter_images()), [spans(match) for match in IMAGE_PATTERN.finditer(text)])
+
+    def test_adversarial_input_is_fast(self):
+        # the old link pattern needs minutes for the first one and seconds for the others
+        for text in ["[a](" + "x" * 50000, "[a](b" * 10000, "[](" * 20000, "![a](" * 10000]:
+            start = time.perf_counter()
+            list(LinkScanner(text).iter_links())
+            list(LinkScanner(text).iter_images())
+            self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
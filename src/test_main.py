@@ -0,0 +1,244 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from main import *
+
+
+TEMPLATE = "<html><title>{{ Title }}</title><meta name=\"author\" content=\"{{ author }}\"><body>{{ Content }}</body></html>"
+
+
+class TestPageBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, "content")
+        self.template = self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home\n\nSee [tom](/blog/tom) and ![pic](/images/tom.png)")
+        self.write("content/blog/tom/index.md", "# Tom\n\n" + "Some **bold** text.\n\n" * 200)
+        self.write("content/blog/notes.txt", "not markdown")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as opened_file:
+            opened_file.write(text)
+        return path
+
+    def read_tree(self, root):
+        files = {}
+        for rel_path in list_files(root):
+            with open(os.path.join(root, rel_path)) as opened_file:
+                files[rel_path] = opened_file.read()
+        return files
+
+    def test_discover_pages(self):
+        dest = os.path.join(self.root, "docs")
+        self.assertEqual(
+            discover_pages(self.content, dest),
+            [
+                (os.path.join(self.content, "blog", "tom", "index.md"), os.path.join(dest, "blog", "tom", "index.html")),
+                (os.path.join(self.content, "index.md"), os.path.join(dest, "index.html")),
+            ],
+        )
+
+    def test_parallel_build_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        generate_pages_recursive(self.content, self.template, serial, "/repo/")
+        generate_pages_recursive(self.content, self.template, parallel, "/repo/", jobs=2)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+        self.assertEqual(sorted(self.read_tree(serial)), ["blog/tom/index.html", "index.html"])
+
+    def test_front_matter_fills_template_slots(self):
+        self.write("content/index.md", "---\nauthor: Tolkien\n---\n# Home\n\nHello")
+        dest = os.path.join(self.root, "docs", "index.html")
+        generate_page(os.path.join(self.content, "index.md"), self.template, dest, "/")
+        with open(dest) as opened_file:
+            self.assertEqual(
+                opened_file.read(),
+                '<html><title>Home</title><meta name="author" content="Tolkien">'
+                '<body><div><h1>Home</h1><p>Hello</p></div></body></html>',
+            )
+
+    def test_streamed_page_matches_in_memory_render(self):
+        markdown = "# Big\n\n" + "```\ncode\n\n    indented\n```\n\n- a **b**\n- c\n\n" * 50
+        self.write("content/big.md", markdown)
+        dest = os.path.join(self.root, "docs", "big.html")
+        generate_page(os.path.join(self.content, "big.md"), self.template, dest, "/")
+        expected = Template(TEMPLATE).render({"Title": "Big", "Content": markdown_to_html_node(markdown).to_html()})
+        with open(dest) as opened_file:
+            self.assertEqual(opened_file.read(), expected)
+
+    def test_failed_render_keeps_the_previous_output(self):
+        dest = os.path.join(self.root, "docs", "big.html")
+        self.write("content/big.md", "# Big\n\nFine")
+        generate_page(os.path.join(self.content, "big.md"), self.template, dest, "/")
+        with open(dest) as opened_file:
+            good = opened_file.read()
+        # plenty of html gets streamed out before the broken last paragraph is reached
+        self.write("content/big.md", "# Big\n\n" + "Some text.\n\n" * 2000 + "an unclosed **bold")
+        with self.assertRaises(Exception):
+            generate_page(os.path.join(self.content, "big.md"), self.template, dest, "/")
+        with open(dest) as opened_file:
+            self.assertEqual(opened_file.read(), good)
+        self.assertEqual(os.listdir(os.path.dirname(dest)), ["big.html"])
+
+    def test_incremental_build_only_renders_changed_pages(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        home = os.path.join(dest, "index.html")
+        tom = os.path.join(dest, "blog", "tom", "index.html")
+        os.utime(home, ns=(1, 1))
+        os.utime(tom, ns=(1, 1))
+
+        self.write("content/index.md", "# Home again")
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertNotEqual(os.stat(home).st_mtime_ns, 1)
+        self.assertEqual(os.stat(tom).st_mtime_ns, 1)
+
+        os.remove(os.path.join(self.content, "blog", "tom", "index.md"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertFalse(os.path.exists(tom))
+
+    def test_changed_asset_re_renders_only_pages_using_it(self):
+        dest = os.path.join(self.root, "docs")
+        self.write("content/index.md", "# Home\n\n![tom](/images/tom.png)")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertEqual(manifest.pages[os.path.join(self.content, "index.md")]["refs"], ["images/tom.png"])
+        home = os.path.join(dest, "index.html")
+        tom = os.path.join(dest, "blog", "tom", "index.html")
+        os.utime(home, ns=(1, 1))
+        os.utime(tom, ns=(1, 1))
+
+        build_pages(self.content, self.template, dest, "/", manifest,
+                    changed_assets=[os.path.join("images", "tom.png")])
+        self.assertNotEqual(os.stat(home).st_mtime_ns, 1)
+        self.assertEqual(os.stat(tom).st_mtime_ns, 1)
+
+    def test_minify_rebuilds_every_page(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.write("template.html", "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        build_pages(self.content, self.template, dest, "/", manifest, minify=True)
+        with open(os.path.join(dest, "index.html")) as page_file:
+            self.assertTrue(page_file.read().startswith("<html><body><div><h1>Home</h1>"))
+        build_pages(self.content, self.template, dest, "/", manifest, minify=True)
+        self.assertFalse(manifest.inputs_changed)
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertTrue(manifest.inputs_changed)
+
+    def test_parser_version_rebuilds_every_page(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertFalse(manifest.inputs_changed)
+        with mock.patch("build.PARSER_VERSION", PARSER_VERSION + 1):
+            build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertTrue(manifest.inputs_changed)
+
+    def test_only_selectors(self):
+        self.write("content/blog/ann/index.md", "# Ann")
+        self.write("content/about.md", "# About")
+        dest = os.path.join(self.root, "docs")
+
+        def selected(*only):
+            selectors = [normalize_selector(selector, self.content) for selector in only]
+            return sorted(os.path.relpath(source, self.content) for source, _ in
+                          discover_pages(self.content, dest, selectors))
+
+        tom = os.path.join("blog", "tom", "index.md")
+        ann = os.path.join("blog", "ann", "index.md")
+        self.assertEqual(selected("blog/tom"), [tom])
+        self.assertEqual(selected("blog/tom/"), [tom])
+        self.assertEqual(selected("about"), ["about.md"])
+        self.assertEqual(selected(os.path.join(self.content, "blog")), [ann, tom])
+        self.assertEqual(selected("blog/*/index.md", "index.md"), [ann, tom, "index.md"])
+        self.assertEqual(selected("*.md"), ["about.md", ann, tom, "index.md"])
+        self.assertEqual(selected("blog/t*"), [tom])
+        self.assertEqual(selected("nothing"), [])
+        self.assertEqual(selected("./blog/./tom"), [tom])
+
+    def test_only_rejects_selecting_everything(self):
+        for selector in ("", ".", "./", "/", "content", "content/", "./content/", self.content):
+            with self.assertRaises(ValueError, msg=selector):
+                normalize_selector(selector, self.content if selector == self.content else "content")
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+            parse_args(["--only", "content/"])
+        # an empty selector that slips through still walks the whole tree
+        self.assertEqual(len(discover_pages(self.content, "docs", [""])), 2)
+
+    def test_gzip_options(self):
+        # a bare --gzip doesn't swallow the basepath after it
+        args = parse_args(["--gzip", "/repo/"])
+        self.assertEqual((args.basepath, args.gzip, args.gzip_level), ("/repo/", True, DEFAULT_GZIP_LEVEL))
+        args = parse_args(["watch", "--gzip", "--gzip-level", "9", "/repo/"])
+        self.assertEqual((args.command, args.basepath, args.gzip_level), ("watch", "/repo/", 9))
+        self.assertIsNone(parse_args(["/repo/"]).gzip_level)
+        for argv in (["--gzip-level", "9"], ["--gzip", "--gzip-level", "0"]):
+            with self.assertRaises(SystemExit, msg=argv), contextlib.redirect_stderr(io.StringIO()):
+                parse_args(argv)
+
+    def test_scan_site_lists_pages_and_assets_once(self):
+        static = os.path.join(self.root, "static")
+        self.write("static/images/tom.png", "png")
+        self.write("static/index.css", "body {}")
+        sources = scan_site(self.content, static)
+        self.assertEqual(sources, {
+            "pages": [os.path.join("blog", "tom", "index.md"), "index.md"],
+            "assets": [os.path.join("images", "tom.png"), "index.css"],
+        })
+        self.assertEqual(scan_site(self.content, None, ["blog"]),
+                         {"pages": [os.path.join("blog", "tom", "index.md")], "assets": []})
+
+        # the build renders what the scan found, it doesn't walk content/ again
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        self.write("content/late.md", "# Late")
+        build_pages(self.content, self.template, dest, "/", manifest, sources=sources)
+        self.assertEqual(sorted(self.read_tree(dest)), ["blog/tom/index.html", "index.html"])
+
+    def test_only_build_leaves_other_pages_alone(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        home = os.path.join(dest, "index.html")
+        tom = os.path.join(dest, "blog", "tom", "index.html")
+        os.utime(home, ns=(1, 1))
+        os.utime(tom, ns=(1, 1))
+
+        # a deleted page outside the selection isn't pruned
+        os.remove(os.path.join(self.content, "index.md"))
+        self.write("content/blog/tom/index.md", "# Tom again")
+        build_pages(self.content, self.template, dest, "/", manifest, only=["blog/tom"])
+        self.assertNotEqual(os.stat(tom).st_mtime_ns, 1)
+        self.assertEqual(os.stat(home).st_mtime_ns, 1)
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.assertFalse(os.path.exists(home))
+
+    def test_only_build_with_new_template_leaves_the_rest_for_later(self):
+        dest = os.path.join(self.root, "docs")
+        manifest = BuildManifest(os.path.join(self.root, "cache", "manifest.json"))
+        build_pages(self.content, self.template, dest, "/", manifest)
+        self.write("template.html", "<main>{{ Content }}</main>")
+        build_pages(self.content, self.template, dest, "/", manifest, only=["index.md"])
+        with open(os.path.join(dest, "blog", "tom", "index.html")) as page_file:
+            self.assertTrue(page_file.read().startswith("<html>"))
+        # the full build after it still knows tom is outdated
+        build_pages(self.content, self.template, dest, "/", manifest)
+        with open(os.path.join(dest, "blog", "tom", "index.html")) as page_file:
+            self.assertTrue(page_file.read().startswith("<main>"))
+
+
+if __name__ == "__main__":
+    unittest.main()
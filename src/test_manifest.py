@@ -0,0 +1,98 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from manifest import *
+
+
+class TestBuildManifest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.manifest_path = os.path.join(self.root, "cache", "manifest.json")
+        self.dest_root = os.path.join(self.root, "docs")
+        self.dest_path = os.path.join(self.dest_root, "blog", "index.html")
+        os.makedirs(os.path.dirname(self.dest_path))
+        with open(self.dest_path, 'w') as dest_file:
+            dest_file.write("<p>hi</p>")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hash_file(self):
+        source_path = os.path.join(self.root, "page.md")
+        with open(source_path, 'w') as source_file:
+            source_file.write("# Title")
+        self.assertEqual(hash_file(source_path), hashlib.sha256(b"# Title").hexdigest())
+
+    def test_unchanged_page_is_fresh_after_reload(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin_build("template", "/")
+        self.assertFalse(manifest.is_fresh("content/blog/index.md", "abc", self.dest_path))
+        manifest.record("content/blog/index.md", "abc", self.dest_path)
+        manifest.save()
+
+        reloaded = BuildManifest(self.manifest_path)
+        reloaded.begin_build("template", "/")
+        self.assertTrue(reloaded.is_fresh("content/blog/index.md", "abc", self.dest_path))
+        self.assertFalse(reloaded.is_fresh("content/blog/index.md", "changed", self.dest_path))
+
+    def test_template_or_basepath_change_invalidates(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin_build("template", "/")
+        manifest.record("content/blog/index.md", "abc", self.dest_path)
+
+        manifest.begin_build("new template", "/")
+        self.assertFalse(manifest.is_fresh("content/blog/index.md", "abc", self.dest_path))
+        manifest.begin_build("new template", "/repo/")
+        self.assertFalse(manifest.is_fresh("content/blog/index.md", "abc", self.dest_path))
+        manifest.begin_build("new template", "/repo/")
+        self.assertTrue(manifest.is_fresh("content/blog/index.md", "abc", self.dest_path))
+
+    def test_pages_using_assets(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin_build("template", "/")
+        manifest.record("content/index.md", "abc", self.dest_path, ["images/tom.png", "blog/tom"])
+        manifest.record("content/blog/index.md", "def", self.dest_path, ["index.css"])
+        manifest.record("content/old.md", "ghi", self.dest_path)
+        manifest.save()
+
+        reloaded = BuildManifest(self.manifest_path)
+        self.assertEqual(reloaded.pages_using([os.path.join("images", "tom.png")]), ["content/index.md"])
+        self.assertEqual(reloaded.pages_using(["index.css", "images/tom.png"]),
+                         ["content/blog/index.md", "content/index.md"])
+        self.assertEqual(reloaded.pages_using(["unused.png"]), [])
+
+    def test_missing_output_is_not_fresh(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin_build("template", "/")
+        manifest.record("content/blog/index.md", "abc", self.dest_path)
+        manifest.begin_build("template", "/")
+        os.remove(self.dest_path)
+        self.assertFalse(manifest.is_fresh("content/blog/index.md", "abc", self.dest_path))
+
+    def test_prune_removes_deleted_sources(self):
+        manifest = BuildManifest(self.manifest_path)
+        manifest.begin_build("template", "/")
+        manifest.record("content/blog/index.md", "abc", self.dest_path)
+
+        manifest.begin_build("template", "/")
+        removed = manifest.prune(self.dest_root)
+        self.assertEqual(removed, [self.dest_path])
+        self.assertFalse(os.path.exists(self.dest_path))
+        # the emptied blog/ directory goes too, but docs/ itself stays
+        self.assertFalse(os.path.exists(os.path.dirname(self.dest_path)))
+        self.assertTrue(os.path.isdir(self.dest_root))
+        self.assertEqual(manifest.pages, {})
+
+    def test_corrupt_manifest_means_full_rebuild(self):
+        os.makedirs(os.path.dirname(self.manifest_path))
+        with open(self.manifest_path, 'w') as manifest_file:
+            manifest_file.write("{not json")
+        manifest = BuildManifest(self.manifest_path)
+        self.assertEqual(manifest.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
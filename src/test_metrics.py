@@ -0,0 +1,66 @@
+import json
+import os
+import tempfile
+import unittest
+
+from textnode import *
+from metrics import *
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.source = os.path.join(self.root, "index.md")
+        with open(self.source, 'w') as source_file:
+            source_file.write("# Home café\n\nA [link](/blog) and **bold**\n\n- one\n- two")
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, 'w') as template_file:
+            template_file.write('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, path):
+        with open(path) as opened_file:
+            return opened_file.read()
+
+    def test_page_metrics_do_not_change_output(self):
+        plain = os.path.join(self.root, "plain.html")
+        timed = os.path.join(self.root, "timed.html")
+        generate_page(self.source, self.template, plain, "/repo/")
+        metrics = generate_page(self.source, self.template, timed, "/repo/", PageMetrics(self.source))
+        self.assertEqual(self.read(plain), self.read(timed))
+
+        self.assertEqual(set(metrics.times), set(STAGES))
+        self.assertTrue(all(seconds >= 0 for seconds in metrics.times.values()))
+        self.assertEqual(metrics.counts["blocks"], 3)
+        # bytes, not characters: é is two of them
+        self.assertEqual(metrics.counts["bytes_out"], os.path.getsize(timed))
+        self.assertEqual(metrics.counts["bytes_in"], os.path.getsize(self.source))
+
+    def test_markdown_to_html_node_with_null_metrics(self):
+        # the default metrics object swallows everything
+        node = markdown_to_html_node("# Title\n\ntext")
+        self.assertEqual(node.to_html(), "<div><h1>Title</h1><p>text</p></div>")
+
+    def test_build_report(self):
+        build = BuildMetrics()
+        build.add_page(generate_page(self.source, self.template, os.path.join(self.root, "a.html"), "/",
+                                     PageMetrics(self.source)))
+        build.count("pages_skipped", 2)
+        with build.phase("static_sync"):
+            pass
+        report_path = os.path.join(self.root, "metrics.json")
+        build.write(report_path)
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report["pages_rendered"], 1)
+        self.assertEqual(report["counts"], {"pages_skipped": 2})
+        self.assertIn("static_sync", report["phases_s"])
+        self.assertEqual(report["slowest_pages"], [self.source])
+        self.assertEqual(report["pages"][0]["blocks"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
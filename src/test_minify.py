@@ -0,0 +1,50 @@
+import io
+import unittest
+
+from htmlnode import *
+from template import *
+from minify import *
+
+
+class TestMinify(unittest.TestCase):
+    def test_whitespace_between_blocks_goes(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title>{{ Title }}</title>\n  </head>\n  <body>\n    <p>hi</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify_html(html),
+                         "<!doctype html><html><head><title>{{ Title }}</title></head><body><p>hi</p></body></html>")
+
+    def test_inline_whitespace_collapses_to_one_space(self):
+        self.assertEqual(minify_html("<p>a  <b>x</b>\n  <i>y</i>\t z</p>"), "<p>a <b>x</b> <i>y</i> z</p>")
+        # a non-breaking space is content
+        self.assertEqual(minify_html("<p>a  b</p>"), "<p>a  b</p>")
+
+    def test_preformatted_and_scripts_are_kept(self):
+        html = "<pre>  a\n\n  b</pre>\n<script>if (a>b) // x\n  go()</script> <textarea>  x  </textarea>"
+        self.assertEqual(minify_html(html), "<pre>  a\n\n  b</pre><script>if (a>b) // x\n  go()</script><textarea>  x  </textarea>")
+
+    def test_comments(self):
+        self.assertEqual(minify_html("<p>a <!-- note --> b</p>"), "<p>a b</p>")
+        self.assertEqual(minify_html("<!--[if IE]><p>old</p><![endif]-->"), "<!--[if IE]><p>old</p><![endif]-->")
+
+    def test_quoted_angle_bracket_in_attribute(self):
+        self.assertEqual(minify_html('<a title="a > b">x  y</a>'), '<a title="a > b">x y</a>')
+
+    def test_write_html_leaves_code_alone(self):
+        node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "some   text\n"), LeafNode("code", "a  =  b"), LeafNode("b", "x  y")]),
+            ParentNode("pre", [LeafNode("code", "def f():\n    return  1\n")]),
+        ])
+        stream = io.StringIO()
+        node.write_html(stream, True)
+        self.assertEqual(stream.getvalue(), "<div><p>some text <code>a  =  b</code><b>x y</b></p>"
+                                            "<pre><code>def f():\n    return  1\n</code></pre></div>")
+
+    def test_minified_template(self):
+        template = Template("<html>\n  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>\n", minify=True)
+        stream = io.StringIO()
+        template.write(stream, {"Content": ParentNode("p", [LeafNode(None, "a   b")])})
+        self.assertEqual(stream.getvalue(), "<html><body><article><p>a b</p></article></body></html>")
+        self.assertNotEqual(template, Template("<html>\n  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
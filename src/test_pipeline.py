@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from build import *
+from assets import *
+
+
+class TestPagePipeline(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, "content")
+        self.template_path = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.template = load_template(self.template_path, "/repo/")
+        self.write("content/index.md", "---\nauthor: Tom\n---\n# Home café\n\nSee [tom](/blog/tom) and ![pic](/images/tom.png)")
+        for index in range(20):
+            self.write(f"content/blog/post{index}/index.md", f"# Post {index}\n\n" + "Some **bold** text.\n\n" * 50)
+        self.write("content/blog/crlf/index.md", "# Windows\r\n\r\nline one\r\nline two\r\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', newline="") as opened_file:
+            opened_file.write(text)
+        return path
+
+    def read_tree(self, root):
+        files = {}
+        for rel_path in list_files(root):
+            with open(os.path.join(root, rel_path)) as opened_file:
+                files[rel_path] = opened_file.read()
+        return files
+
+    def pages(self, dest):
+        return discover_pages(self.content, os.path.join(self.root, dest))
+
+    def test_matches_serial_build(self):
+        serial_refs = render_pages(self.pages("serial"), self.template_path, "/repo/")
+        pipeline = PagePipeline(self.template, "/repo/", writers=3, depth=2)
+        pipeline_refs = pipeline.run(self.pages("pipelined"))
+        self.assertEqual(self.read_tree(os.path.join(self.root, "serial")),
+                         self.read_tree(os.path.join(self.root, "pipelined")))
+        self.assertEqual(pipeline_refs, serial_refs)
+        self.assertEqual(pipeline_refs[os.path.join(self.content, "index.md")], ["blog/tom", "images/tom.png"])
+
+    def test_big_pages_are_streamed(self):
+        render_pages(self.pages("serial"), self.template_path, "/repo/")
+        pipeline = PagePipeline(self.template, "/repo/", max_source_bytes=100)
+        pipeline.run(self.pages("pipelined"))
+        self.assertEqual(self.read_tree(os.path.join(self.root, "serial")),
+                         self.read_tree(os.path.join(self.root, "pipelined")))
+
+    def test_with_ast_cache_and_metrics(self):
+        ast_cache = ASTCache(os.path.join(self.root, "ast"))
+        render_pages(self.pages("serial"), self.template_path, "/repo/")
+        for _ in range(2):
+            metrics = BuildMetrics()
+            render_pages(self.pages("pipelined"), self.template_path, "/repo/", metrics=metrics, ast_cache=ast_cache,
+                         io_threads=2)
+            self.assertEqual(self.read_tree(os.path.join(self.root, "serial")),
+                             self.read_tree(os.path.join(self.root, "pipelined")))
+        report = metrics.report()
+        self.assertEqual(report["pages_rendered"], 22)
+        self.assertEqual(report["ast_cache_hits"], 22)
+        self.assertEqual(report["bytes_out"],
+                         sum(len(html.encode("utf-8"))
+                             for html in self.read_tree(os.path.join(self.root, "serial")).values()))
+
+    def test_write_error_is_raised(self):
+        # a file where the page's directory should go
+        self.write("pipelined/blog/post3", "in the way")
+        with self.assertRaises(OSError):
+            PagePipeline(self.template, "/repo/", depth=1).run(self.pages("pipelined"))
+
+    def test_failed_write_keeps_the_previous_page(self):
+        index_path = self.write("pipelined/index.html", "old page")
+        with mock.patch("pipeline.os.replace", side_effect=OSError("disk full")), self.assertRaises(OSError):
+            PagePipeline(self.template, "/repo/", depth=1).run(self.pages("pipelined"))
+        with open(index_path) as index_file:
+            self.assertEqual(index_file.read(), "old page")
+        self.assertFalse([rel_path for rel_path in list_files(os.path.join(self.root, "pipelined"))
+                          if rel_path.endswith(".tmp")])
+
+    def test_parse_error_is_raised(self):
+        self.write("content/blog/post7/index.md", "# Broken\n\nthis is **not closed")
+        with self.assertRaises(Exception):
+            PagePipeline(self.template, "/repo/", depth=1).run(self.pages("pipelined"))
+
+
+if __name__ == "__main__":
+    unittest.main()
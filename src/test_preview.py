@@ -0,0 +1,135 @@
+import http.client
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from preview import *
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.temp_dir.name, "content")
+        self.static = os.path.join(self.temp_dir.name, "static")
+        self.template = self.write("template.html", "<title>{{ Title }}</title><body>{{ Content }}</body>")
+        self.write("content/index.md", "# Home\n\n[Tom](/blog/tom/)")
+        self.write("content/blog/tom/index.md", "# Tom\n\nHi")
+        self.write("content/notes.md", "# Notes\n\nSome")
+        self.write("static/index.css", "body {}")
+        self.write("secret.md", "# Secret")
+        self.server = PreviewServer(("127.0.0.1", 0), self.content, self.static, self.template, "/repo/")
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def write(self, rel_path, text, mtime_ns=None):
+        path = os.path.join(self.temp_dir.name, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as opened_file:
+            opened_file.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        return path
+
+    def get(self, path, **headers):
+        self.connection.request("GET", path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read().decode("utf-8")
+
+    def test_pages_render_from_content(self):
+        response, body = self.get("/repo/")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "text/html; charset=utf-8")
+        self.assertIn("<title>Home</title>", body)
+        # links get the basepath like a build would give them
+        self.assertIn('href="/repo/blog/tom/"', body)
+        self.assertIn("<p>Hi</p>", self.get("/repo/blog/tom/")[1])
+        self.assertIn("<title>Notes</title>", self.get("/repo/notes.html")[1])
+
+    def test_matches_a_build(self):
+        dest = os.path.join(self.temp_dir.name, "docs", "index.html")
+        generate_page(os.path.join(self.content, "index.md"), self.template, dest, "/repo/")
+        with open(dest) as built_file:
+            self.assertEqual(self.get("/repo/")[1], built_file.read())
+
+    def test_pages_are_cached_until_they_change(self):
+        with mock.patch("preview.render_page_html", wraps=render_page_html) as render:
+            first = self.get("/repo/blog/tom/")[1]
+            self.assertEqual(self.get("/repo/blog/tom/")[1], first)
+            self.assertEqual(render.call_count, 1)
+
+            # saved without changes: hashed again, not rendered again
+            path = os.path.join(self.content, "blog", "tom", "index.md")
+            os.utime(path, ns=(10**18, 10**18))
+            self.get("/repo/blog/tom/")
+            self.assertEqual(render.call_count, 1)
+
+            self.write("content/blog/tom/index.md", "# Tom\n\nBye", 2 * 10**18)
+            self.assertIn("<p>Bye</p>", self.get("/repo/blog/tom/")[1])
+            self.assertEqual(render.call_count, 2)
+
+            # a new template re-renders every page
+            self.write("template.html", "<h6>{{ Title }}</h6>{{ Content }}", 2 * 10**18)
+            self.assertIn("<h6>Tom</h6>", self.get("/repo/blog/tom/")[1])
+            self.assertEqual(render.call_count, 3)
+
+    def test_conditional_requests(self):
+        response, body = self.get("/repo/")
+        etag = response.getheader("ETag")
+        response, body = self.get("/repo/", **{"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, ""))
+        self.write("content/index.md", "# Home again", 10**18)
+        response, body = self.get("/repo/", **{"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertIn("Home again", body)
+
+    def test_least_recently_used_pages_are_evicted(self):
+        pages = self.server.pages
+        pages.max_bytes = 1
+        self.get("/repo/")
+        self.get("/repo/notes.html")
+        self.assertEqual(list(pages.pages), [os.path.join(os.path.realpath(self.content), "notes.md")])
+        self.assertEqual(pages.size, len(pages.pages[list(pages.pages)[0]].html))
+
+    def test_static_files_redirects_and_misses(self):
+        response, body = self.get("/repo/index.css")
+        self.assertEqual((response.status, body), (200, "body {}"))
+        response, body = self.get("/repo/blog/tom")
+        self.assertEqual((response.status, response.getheader("Location")), (301, "/repo/blog/tom/"))
+        self.assertEqual(self.get("/repo")[0].getheader("Location"), "/repo/")
+        for path in ("/repo/missing/", "/repo/notes.md", "/repo/../secret.html", "/notes.html"):
+            self.assertEqual(self.get(path)[0].status, 404, path)
+
+    def test_ast_cache_is_evicted_while_previewing(self):
+        pages = self.server.pages
+        pages.ast_cache = ASTCache(os.path.join(self.temp_dir.name, "ast"))
+        with mock.patch.object(pages.ast_cache, "evict") as evict:
+            self.get("/repo/")
+            self.assertEqual(evict.call_count, 0)
+            pages.evicted_at -= AST_EVICT_INTERVAL
+            self.get("/repo/notes.html")
+            self.get("/repo/blog/tom/")
+            self.assertEqual(evict.call_count, 1)
+            pages.evict_ast_cache(force=True)
+            self.assertEqual(evict.call_count, 2)
+
+    def test_render_errors_are_reported(self):
+        with mock.patch("preview.render_page_html", side_effect=ValueError("unclosed **")), \
+                self.assertLogs("preview", "ERROR"):
+            response, body = self.get("/repo/notes.html")
+        self.assertEqual(response.status, 500)
+        self.assertIn("unclosed **", body)
+        # and the server keeps going
+        self.assertEqual(self.get("/repo/notes.html")[0].status, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
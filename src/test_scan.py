@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from scan import *
+
+
+class TestScanFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "content")
+        for rel_path in ("index.md", "blog/tom/index.md", "blog/tom/tom.png", "blog-x.md", "zeta/a/b/c.md"):
+            self.write(rel_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, rel_path):
+        path = os.path.join(self.root, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as opened_file:
+            opened_file.write(rel_path)
+
+    def test_sorted_relative_paths(self):
+        expected = sorted(os.path.join(*rel_path.split("/")) for rel_path in
+                          ("index.md", "blog/tom/index.md", "blog/tom/tom.png", "blog-x.md", "zeta/a/b/c.md"))
+        self.assertEqual(scan_files(self.root), expected)
+        self.assertEqual(scan_files(self.root, ".png"), [os.path.join("blog", "tom", "tom.png")])
+
+    def test_entries_are_the_files(self):
+        for rel_path, entry in walk_files(self.root):
+            self.assertEqual(entry.path, os.path.join(self.root, rel_path))
+            self.assertTrue(entry.is_file())
+
+    def test_filters_skip_subtrees(self):
+        entered = []
+
+        def keep_dir(rel_dir):
+            entered.append(rel_dir)
+            return rel_dir != "zeta"
+
+        self.assertEqual(scan_files(self.root, ".md", keep_dir, lambda rel_path: "tom" not in rel_path),
+                         ["blog-x.md", "index.md"])
+        self.assertEqual(sorted(entered), ["blog", os.path.join("blog", "tom"), "zeta"])
+
+    def test_symlinked_directories_are_entered_but_loops_are_not(self):
+        elsewhere = os.path.join(self.temp_dir.name, "elsewhere")
+        os.makedirs(os.path.join(elsewhere, "sub"))
+        with open(os.path.join(elsewhere, "sub", "a.css"), 'w') as opened_file:
+            opened_file.write("a")
+        try:
+            os.symlink(elsewhere, os.path.join(self.root, "linked"))
+            os.symlink(os.path.join(self.root, "blog"), os.path.join(self.root, "blog", "tom", "loop"))
+        except (OSError, NotImplementedError):
+            self.skipTest("no symlinks here")
+        found = scan_files(self.root)
+        self.assertIn(os.path.join("linked", "sub", "a.css"), found)
+        # blog/tom/loop is blog again, walking into it would never end
+        self.assertIn(os.path.join("blog", "tom", "tom.png"), found)
+        self.assertFalse(any(rel_path.startswith(os.path.join("blog", "tom", "loop")) for rel_path in found))
+
+    def test_missing_root(self):
+        missing = os.path.join(self.temp_dir.name, "missing")
+        with self.assertRaises(FileNotFoundError):
+            scan_files(missing)
+        self.assertEqual(scan_files(missing, missing_ok=True), [])
+
+    def test_deep_trees(self):
+        deep = os.path.join(self.temp_dir.name, "deep")
+        path = os.path.join(deep, *["d"] * 200)
+        os.makedirs(path)
+        with open(os.path.join(path, "page.md"), 'w') as opened_file:
+            opened_file.write("# Deep")
+        self.assertEqual(scan_files(deep), [os.path.join(*["d"] * 200, "page.md")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import gzip
+import http.client
+import os
+import tempfile
+import threading
+import unittest
+
+from serve import *
+
+
+class TestStaticServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.temp_dir.name, "docs")
+        self.write("index.html", b"<p>home</p>")
+        self.write("blog/tom/index.html", b"<p>tom</p>")
+        self.write("images/big.png", os.urandom(SENDFILE_MIN_BYTES * 3))
+        with open(os.path.join(self.temp_dir.name, "secret.txt"), 'w') as secret_file:
+            secret_file.write("secret")
+        self.server = StaticServer(("127.0.0.1", 0), self.root, "/repo/", ttl=0)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.01,), daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def write(self, rel_path, data):
+        path = os.path.join(self.root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as opened_file:
+            opened_file.write(data)
+        return path
+
+    def get(self, path, method="GET", **headers):
+        # one keep-alive connection for every request of a test
+        self.connection.request(method, path, headers=headers)
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_serves_files_under_the_prefix(self):
+        response, body = self.get("/repo/")
+        self.assertEqual((response.status, body), (200, b"<p>home</p>"))
+        self.assertEqual(response.getheader("Content-Type"), "text/html; charset=utf-8")
+        response, body = self.get("/repo/blog/tom/")
+        self.assertEqual(body, b"<p>tom</p>")
+        self.assertEqual(self.get("/index.html")[0].status, 404)
+
+    def test_directories_redirect_to_their_slash(self):
+        response, body = self.get("/repo/blog/tom")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/repo/blog/tom/")
+        self.assertEqual(self.get("/repo")[0].getheader("Location"), "/repo/")
+
+    def test_nothing_outside_the_site(self):
+        for path in ("/repo/../secret.txt", "/repo/%2e%2e/secret.txt", "/repo/blog/../../secret.txt"):
+            self.assertEqual(self.get(path)[0].status, 404)
+
+    def test_aliases_share_one_cache_entry(self):
+        aliases = ["/repo/", "/repo/index.html", "/repo//index.html", "/repo/%69ndex.html", "/repo/blog/../index.html",
+                   "/repo/./index.html"] + [f"/repo/{'a/../' * count}index.html" for count in range(1, 50)]
+        for alias in aliases:
+            self.assertEqual(self.get(alias)[1], b"<p>home</p>", alias)
+        self.assertEqual(list(self.server.site.entries), ["index.html"])
+
+    def test_conditional_requests(self):
+        response, body = self.get("/repo/index.html")
+        etag, last_modified = response.getheader("ETag"), response.getheader("Last-Modified")
+        response, body = self.get("/repo/index.html", **{"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        response, body = self.get("/repo/index.html", **{"If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 304)
+        # a rebuilt page gets a new etag
+        path = self.write("index.html", b"<p>home again</p>")
+        os.utime(path, ns=(10**18, 10**18))
+        response, body = self.get("/repo/index.html", **{"If-None-Match": etag})
+        self.assertEqual((response.status, body), (200, b"<p>home again</p>"))
+
+    def test_gzip_sidecar(self):
+        path = os.path.join(self.root, "index.html")
+        with open(path + ".gz", 'wb') as sidecar:
+            sidecar.write(gzip.compress(b"<p>home</p>"))
+        stat = os.stat(path)
+        os.utime(path + ".gz", ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        response, body = self.get("/repo/", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(gzip.decompress(body), b"<p>home</p>")
+        response, body = self.get("/repo/", **{"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(body, b"<p>home</p>")
+
+        # a sidecar older than its page is ignored
+        os.utime(path + ".gz", ns=(1, 1))
+        response, body = self.get("/repo/", **{"Accept-Encoding": "gzip"})
+        self.assertEqual(body, b"<p>home</p>")
+
+    def test_big_files_and_head(self):
+        with open(os.path.join(self.root, "images", "big.png"), 'rb') as image_file:
+            image = image_file.read()
+        response, body = self.get("/repo/images/big.png")
+        self.assertEqual(body, image)
+        self.assertEqual(response.getheader("Content-Type"), "image/png")
+        response, body = self.get("/repo/images/big.png", method="HEAD")
+        self.assertEqual((response.getheader("Content-Length"), body), (str(len(image)), b""))
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate"))
+        self.assertTrue(accepts_gzip("*"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("br"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import io
+import os
+import tempfile
+import unittest
+
+from htmlnode import *
+from template import *
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><article>{{Content}}</article>")
+        self.assertEqual(template.literals, ["<title>", "</title><article>", "</article>"])
+        self.assertEqual(template.slot_names(), ["Title", "Content"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title>{{ Content }}<p>{{ author }}</p>")
+        self.assertEqual(
+            template.render({"Title": "Tom", "Content": "<p>hi</p>", "author": "JRR"}),
+            "<title>Tom</title><p>hi</p><p>JRR</p>",
+        )
+
+    def test_unknown_slots_are_left_alone(self):
+        template = Template("<p>{{ missing }}</p>{{ Title }}")
+        self.assertEqual(template.render({"Title": "Tom"}), "<p>{{ missing }}</p>Tom")
+
+    def test_no_slots(self):
+        template = Template("<html></html>")
+        self.assertEqual(template.render({"Title": "ignored"}), "<html></html>")
+
+    def test_slot_values_are_not_rescanned(self):
+        # a page whose content contains a placeholder must not get it filled in
+        template = Template("{{ Content }}|{{ Title }}")
+        self.assertEqual(template.render({"Content": "{{ Title }}", "Title": "T"}), "{{ Title }}|T")
+
+    def test_basepath_applied_at_compile_time(self):
+        template = Template('<link href="/index.css"><script src="//cdn/x.js"></script>{{ Content }}', "/repo/")
+        self.assertEqual(
+            template.render({"Content": '<a href="/x">'}),
+            '<link href="/repo/index.css"><script src="//cdn/x.js"></script><a href="/x">',
+        )
+
+    def test_write_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        stream = io.StringIO()
+        template.write(stream, {"Title": "Tom", "Content": ParentNode("p", [LeafNode("b", "hi")])})
+        self.assertEqual(stream.getvalue(), "<title>Tom</title><article><p><b>hi</b></p></article>")
+
+    def test_load_template_reuses_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "template.html")
+            with open(path, 'w') as template_file:
+                template_file.write("<b>{{ Title }}</b>")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, 'w') as template_file:
+                template_file.write("<i>{{ Title }}</i>!")
+            self.assertEqual(load_template(path).render({"Title": "x"}), "<i>x</i>!")
+
+
+if __name__ == "__main__":
+    unittest.main()
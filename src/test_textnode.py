@@ -17,6 +17,52 @@ class TestTextNode(unittest.TestCase):
         node4 = TextNode("This is a text node", TextType.NORMAL)
         self.assertEqual(node3, node4)
 
+    def test_slots(self):
+        node = TextNode("text", TextType.TEXT)
+        self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_span_is_sliced_lazily(self):
+        source = "before **bold** after"
+        node = TextNode.span(source, 9, 13, TextType.BOLD)
+        self.assertIsNone(node._text)
+        self.assertEqual(node.text, "bold")
+        self.assertEqual(node, TextNode("bold", TextType.BOLD))
+
+    def test_none_text(self):
+        node = TextNode(None, TextType.TEXT)
+        self.assertIsNone(node.text)
+        self.assertEqual(node, TextNode(None, TextType.TEXT))
+        self.assertNotEqual(node, TextNode("", TextType.TEXT))
+        self.assertEqual(repr(node), "TextNode(None, text, None)")
+
+    def test_splits_return_spans_of_the_source(self):
+        source = "a **b** c `d` ![e](/f.png) [g](/h)"
+        nodes = [TextNode(source, TextType.TEXT)]
+        nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+        nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+        nodes = split_nodes_image(nodes)
+        nodes = split_nodes_link(nodes)
+        for node in nodes:
+            self.assertIs(node.source, source)
+            self.assertIsNone(node._text)
+        self.assertEqual(
+            nodes,
+            [
+                TextNode("a ", TextType.TEXT),
+                TextNode("b", TextType.BOLD),
+                TextNode(" c ", TextType.TEXT),
+                TextNode("d", TextType.CODE),
+                TextNode(" ", TextType.TEXT),
+                TextNode("e", TextType.IMAGE, "/f.png"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("g", TextType.LINK, "/h"),
+            ],
+        )
+
+    def test_split_keeps_node_without_matches(self):
+        node = TextNode("nothing to see", TextType.TEXT)
+        self.assertIs(split_nodes_link([node])[0], node)
+
     def test_ineq(self):
         node = TextNode("This Text node BRO:", TextType.ITALIC)
         node2 = TextNode("This is a DIFFERENT NODE CHAMP:", TextType.NORMAL)
@@ -64,6 +110,14 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(html_node.value, "")
         self.assertEqual(html_node.props, {"src": "https://boot.dev/logo.png", "alt": "Boot.dev logo"})
     
+    def test_link_and_image_get_basepath(self):
+        link = text_node_to_html_node(TextNode("Tom", TextType.LINK, "/blog/tom"), "/repo/")
+        self.assertEqual(link.to_html(), '<a href="/repo/blog/tom">Tom</a>')
+        image = text_node_to_html_node(TextNode("Tom", TextType.IMAGE, "/images/tom.png"), "/repo/")
+        self.assertEqual(image.props["src"], "/repo/images/tom.png")
+        external = text_node_to_html_node(TextNode("Boot", TextType.LINK, "https://boot.dev"), "/repo/")
+        self.assertEqual(external.props["href"], "https://boot.dev")
+
     def test_basic_delimiter_splitting(self):
         node = TextNode("This is text with a `code block` word", TextType.TEXT)
         new_nodes = split_nodes_delimiter([node], "`", TextType.CODE)
@@ -599,6 +653,61 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(expected, nodes)
 
 
+    def test_text_to_textnodes_fast_path(self):
+        self.assertEqual(text_to_textnodes("no markup at all"), [TextNode("no markup at all", TextType.TEXT)])
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_text_to_textnodes_every_type_in_one_pass(self):
+        text = "A **bold** and _italic_ with `code`, ![pic](/images/tom.png) and [link](/blog/tom)"
+        self.assertEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("A ", TextType.TEXT),
+                TextNode("bold", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" with ", TextType.TEXT),
+                TextNode("code", TextType.CODE),
+                TextNode(", ", TextType.TEXT),
+                TextNode("pic", TextType.IMAGE, "/images/tom.png"),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "/blog/tom"),
+            ],
+        )
+
+    def test_text_to_textnodes_markers_inside_code_and_urls(self):
+        # underscores in a url or inside code aren't italics
+        text = "Run `snake_case()` or read [docs](https://example.com/a_b)"
+        self.assertEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("Run ", TextType.TEXT),
+                TextNode("snake_case()", TextType.CODE),
+                TextNode(" or read ", TextType.TEXT),
+                TextNode("docs", TextType.LINK, "https://example.com/a_b"),
+            ],
+        )
+
+    def test_text_to_textnodes_lone_markers_are_text(self):
+        text = "5 * 3 [not a link] and ! too"
+        self.assertEqual(text_to_textnodes(text), [TextNode(text, TextType.TEXT)])
+
+    def test_text_to_textnodes_bracket_before_image(self):
+        text = "[ ![pic](/a.png) [x](/u)"
+        self.assertEqual(
+            text_to_textnodes(text),
+            [
+                TextNode("[ ", TextType.TEXT),
+                TextNode("pic", TextType.IMAGE, "/a.png"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("x", TextType.LINK, "/u"),
+            ],
+        )
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("This is **not closed")
+
 class TestBlockToHTML(unittest.TestCase) :   
     def test_paragraphs(self):
         md = """
@@ -770,6 +879,15 @@ class TestBlockToHTML(unittest.TestCase) :
         )
         self.assertEqual(html, expected)
         
+    def test_basepath_only_touches_link_nodes(self):
+        md = 'See [tom](/blog/tom)\n\n```\n<a href="/not/a/link">\n```'
+        html = markdown_to_html_node(md, "/repo/").to_html()
+        self.assertEqual(
+            html,
+            '<div><p>See <a href="/repo/blog/tom">tom</a></p>'
+            '<pre><code><a href="/not/a/link">\n</code></pre></div>',
+        )
+
     def test_code_block_with_markdown_symbols(self):
         md = "```\n# This is a comment\n**bold** _italic_ `code`\n```"
         node = markdown_to_html_node(md)
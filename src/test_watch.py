@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from watch import *
+
+
+class TestSiteWatcher(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home")
+        self.write("content/blog/tom/index.md", "# Tom")
+        self.write("static/index.css", "body {}")
+        self.watcher = SiteWatcher(
+            self.path("content"), self.path("static"), self.path("template.html"), self.path("docs"),
+            "/", BuildManifest(self.path("cache/manifest.json")),
+        )
+        self.watcher.build()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, rel_path):
+        return os.path.join(self.root, rel_path)
+
+    def write(self, rel_path, text):
+        os.makedirs(os.path.dirname(self.path(rel_path)), exist_ok=True)
+        with open(self.path(rel_path), 'w') as opened_file:
+            opened_file.write(text)
+        # make sure the change is visible even on filesystems with coarse mtimes
+        stat = os.stat(self.path(rel_path))
+        os.utime(self.path(rel_path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    def read(self, rel_path):
+        with open(self.path(rel_path)) as opened_file:
+            return opened_file.read()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.watcher.poll(), (0, 0))
+
+    def test_only_the_edited_page_is_rebuilt(self):
+        self.write("content/blog/tom/index.md", "# Tom Bombadil")
+        self.assertEqual(self.watcher.poll(), (1, 0))
+        self.assertEqual(self.read("docs/blog/tom/index.html"), "<title>Tom Bombadil</title><div><h1>Tom Bombadil</h1></div>")
+
+    def test_new_and_deleted_pages(self):
+        self.write("content/contact/index.md", "# Contact")
+        os.remove(self.path("content/blog/tom/index.md"))
+        self.assertEqual(self.watcher.poll(), (2, 0))
+        self.assertTrue(os.path.exists(self.path("docs/contact/index.html")))
+        self.assertFalse(os.path.exists(self.path("docs/blog/tom/index.html")))
+
+    def test_changed_asset_is_synced(self):
+        self.write("static/index.css", "body { color: red }")
+        self.assertEqual(self.watcher.poll(), (0, 1))
+        self.assertEqual(self.read("docs/index.css"), "body { color: red }")
+
+    def test_changed_asset_re_renders_pages_using_it(self):
+        self.write("content/index.md", "# Home\n\n![tom](/images/tom.png)")
+        self.write("static/images/tom.png", "png")
+        self.assertEqual(self.watcher.poll(), (1, 1))
+        self.write("static/images/tom.png", "new png")
+        self.assertEqual(self.watcher.poll(), (1, 1))
+        os.remove(self.path("static/images/tom.png"))
+        self.assertEqual(self.watcher.poll(), (1, 1))
+
+    def test_template_change_rebuilds_every_page(self):
+        self.write("template.html", "<h2>{{ Title }}</h2>")
+        self.assertEqual(self.watcher.poll(), (2, 0))
+        self.assertEqual(self.read("docs/index.html"), "<h2>Home</h2>")
+
+    def test_broken_page_does_not_stop_the_watcher(self):
+        self.write("content/index.md", "# Home\n\nthis is **not closed")
+        self.assertEqual(self.watcher.poll(), (0, 0))
+        self.write("content/index.md", "# Home\n\nthis is **closed**")
+        self.assertEqual(self.watcher.poll(), (1, 0))
+
+    def test_broken_page_during_a_template_change(self):
+        self.write("content/index.md", "# Home\n\nthis is **not closed")
+        self.watcher.poll()
+        self.write("template.html", "<h2>{{ Title }}</h2>{{ Content }}")
+        with self.assertLogs("build", "ERROR"):
+            self.assertEqual(self.watcher.poll(), (1, 0))
+        self.assertEqual(self.read("docs/blog/tom/index.html"), "<h2>Tom</h2><div><h1>Tom</h1></div>")
+        self.write("content/index.md", "# Home again")
+        self.assertEqual(self.watcher.poll(), (1, 0))
+        self.assertEqual(self.read("docs/index.html"), "<h2>Home again</h2><div><h1>Home again</h1></div>")
+
+    def test_broken_page_in_the_first_build(self):
+        self.write("content/index.md", "# Home\n\nthis is **not closed")
+        watcher = SiteWatcher(
+            self.path("content"), self.path("static"), self.path("template.html"), self.path("docs"),
+            "/", BuildManifest(self.path("cache/other.json")),
+        )
+        with self.assertLogs("build", "ERROR"):
+            watcher.build()
+        self.write("content/index.md", "# Home again")
+        self.assertEqual(watcher.poll(), (1, 0))
+        self.assertEqual(self.read("docs/index.html"), "<title>Home again</title><div><h1>Home again</h1></div>")
+
+    def test_force_re_renders_in_the_first_build(self):
+        os.utime(self.path("docs/index.html"), ns=(1, 1))
+        watcher = SiteWatcher(
+            self.path("content"), self.path("static"), self.path("template.html"), self.path("docs"),
+            "/", BuildManifest(self.path("cache/manifest.json")), force=True,
+        )
+        watcher.build()
+        self.assertNotEqual(os.stat(self.path("docs/index.html")).st_mtime_ns, 1)
+        self.assertEqual(watcher.poll(), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
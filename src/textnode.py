@@ -1,7 +1,15 @@
-import re, os
+import io, logging, re, os, time
+from itertools import islice
 from enum import Enum
 
 from htmlnode import *
+from template import *
+from metrics import *
+from linkscan import *
+from manifest import *
+from astcache import *
+
+logger = logging.getLogger(__name__)
 
 
 class TextType(Enum):
@@ -14,11 +22,48 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    """
+    A run of inline text, stored as a (start, end) span of a source string.
+
+    A node made from a plain string is simply a span over all of it. Spans cut out
+    of a paragraph by the split functions only slice their text the first time
+    .text is read (normally when they're turned into html), so splitting a long
+    paragraph into many nodes doesn't keep copying what's left of it.
+    """
+    __slots__ = ("_text", "text_type", "url", "source", "start", "end")
+    
     def __init__(self, text, text_type, url=None):
-        self.text = text
+        self._text = text
+        self.source = text
+        self.start = 0
+        self.end = len(text) if text is not None else 0
         self.text_type = text_type
         self.url = url
     
+    @classmethod
+    def span(cls, source, start, end, text_type, url=None):
+        node = cls.__new__(cls)
+        node._text = None
+        node.source = source
+        node.start = start
+        node.end = end
+        node.text_type = text_type
+        node.url = url
+        return node
+    
+    @property
+    def text(self):
+        # a node made from None has no source to slice either, its text just stays None
+        if self._text is None and self.source is not None:
+            self._text = self.source[self.start:self.end]
+        return self._text
+    
+    @text.setter
+    def text(self, text):
+        self._text = text
+        self.source = text
+        self.start = 0
+        self.end = len(text) if text is not None else 0
         
     def __eq__(self, other):
         if isinstance(other, TextNode):
@@ -30,7 +75,8 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 #classless function meant to work with both classes
-def text_node_to_html_node(text_node):
+def text_node_to_html_node(text_node, basepath="/"):
+    # link and image urls get the basepath here, once, so the rendered page never needs rewriting
     match text_node.text_type:
         case TextType.BOLD:
             return LeafNode("b", text_node.text)
@@ -41,9 +87,9 @@ def text_node_to_html_node(text_node):
         case TextType.CODE:
             return LeafNode("code", text_node.text)
         case TextType.LINK:
-            return LeafNode("a", text_node.text, {"href": text_node.url})
+            return LeafNode("a", text_node.text, shared_props(("href", resolve_url(text_node.url, basepath))))
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+            return LeafNode("img", "", shared_props(("src", resolve_url(text_node.url, basepath)), ("alt", text_node.text)))
         
         case _:
             raise Exception(f"Invalid text type: {text_node.text_type}")
@@ -59,43 +105,38 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
             result.append(node)
             continue 
         
-        #assigns text of current node to text
-        text = node.text
+        # works on offsets into the node's source, the pieces become spans of it
+        # instead of before/delimited/after copies of whatever text is left
+        source, position, end = node.source, node.start, node.end
         
         # loop to handle all occurrences of the delimiter in the text
         while True:
             # locate the first occurrence of the delimiter in the text
-            start_index = text.find(delimiter)
+            start_index = source.find(delimiter, position, end)
 
             # if the delimiter is not found, append the remaining text and break out of the loop
             if start_index == -1:
-                if text:  # Only add if there's remaining text
-                    result.append(TextNode(text, TextType.TEXT))
+                if position < end:  # Only add if there's remaining text
+                    result.append(TextNode.span(source, position, end, TextType.TEXT))
                 break
             
             # locate the closing delimiter
-            end_index = text.find(delimiter, start_index + len(delimiter))
+            end_index = source.find(delimiter, start_index + len(delimiter), end)
 
             # if no closing delimiter, raise an exception
             if end_index == -1:
                 raise Exception(f"No matching delimiter found for {delimiter}")
         
-            #splitting text in three parts :
-            #   -before_text: text prior to opening dilimiter
-            #   -delimited_text: text between dilimiters (which will also get text type)
-            #   -after_text: text after closing delimiter
-            before_text = text[:start_index]  
-            delimited_text = text[start_index + len(delimiter) :end_index]
-            after_text = text[end_index + len(delimiter):]
-        
-            #creates new text node for each part if not empty
-            if before_text:
-                result.append(TextNode(before_text, TextType.TEXT))
-            if delimited_text:
-                result.append(TextNode(delimited_text, text_type))
+            #the text splits in three parts :
+            #   -before: text prior to opening dilimiter
+            #   -delimited: text between dilimiters (which will also get text type)
+            #   -after: text after closing delimiter, which the next round continues with
+            if start_index > position:
+                result.append(TextNode.span(source, position, start_index, TextType.TEXT))
+            if end_index > start_index + len(delimiter):
+                result.append(TextNode.span(source, start_index + len(delimiter), end_index, text_type))
             
-            # update text to the remaining part after the closing delimiter
-            text = after_text
+            position = end_index + len(delimiter)
         
         
     return result
@@ -133,113 +174,122 @@ def extract_markdown_images(text):
     # \(           - literal opening parenthesis (escaped with \)
     # ([^\(\)]*)   - capture group 2: any characters except parentheses, * means zero or more
     # \)           - literal closing parenthesis (escaped with \)
-    matches = re.findall(r"!\[(.*?)\]\((.*?)\)", text)
-    return matches
+    # the scanner matches this pattern without any regex: !\[(.*?)\]\((.*?)\)
+    return [(text[match[2]:match[3]], text[match[4]:match[5]]) for match in LinkScanner(text).iter_images()]
 
 def extract_markdown_links(text):
-    # Updated regex to handle nested parentheses in URLs
-    # We use negative lookbehind (?<!) to ensure we don't match image markdown
-    pattern = r"(?<!!)\[(.*?)\]\(((?:[^()]*|\([^()]*\))*)\)"
-    matches = re.findall(pattern, text)
-    return matches
+    # Handles nested parentheses in URLs, and like the negative lookbehind (?<!!) the
+    # pattern used to have, skips anything that's really an image
+    # (?<!!)\[(.*?)\]\(((?:[^()]*|\([^()]*\))*)\) matched the same, but its nested *
+    # backtracked exponentially on an unclosed "(", the scanner stays linear
+    return [(text[match[2]:match[3]], text[match[4]:match[5]]) for match in LinkScanner(text).iter_links()]
 
-def split_nodes_image(old_nodes):
+def split_nodes_matches(old_nodes, find_matches, text_type):
+    # splits TEXT nodes around every image or link find_matches(scanner, start, end)
+    # yields (see LinkScanner), the pieces are spans so nothing is sliced but the url
     result = []
+    # spans cut from the same source share one scanner, its indexes cover the whole source
+    scanners = {}
     #grabs nodes within old_nodes list one by one
     for node in old_nodes:
         #chekcs if nodes text_type is not TEXT if so will simply append the result and continue to next iteration (node)
         if node.text_type != TextType.TEXT:
             result.append(node)
-            continue 
+            continue
         
-        images = extract_markdown_images(node.text)
+        source, position, end = node.source, node.start, node.end
+        scanner = scanners.get(id(source))
+        if scanner is None:
+            scanner = scanners[id(source)] = LinkScanner(source)
+        for start, match_end, text_start, text_end, url_start, url_end in find_matches(scanner, position, end):
+            if start > position:
+                result.append(TextNode.span(source, position, start, TextType.TEXT))
+            result.append(TextNode.span(source, text_start, text_end, text_type, source[url_start:url_end]))
+            position = match_end
         
-        if not images:
+        if position == node.start:
+            # nothing matched, the node stays as it was
             result.append(node)
-            continue
-            
-        current_text = node.text
-        
-        for alt_text, url, in images:
-            # The full markdown for this image looks like: ![alt_text](url)
-            image_markdown = f"![{alt_text}]({url})"
-            
-            # Split the current_text at the image markdown
-            # This gives us the text before the image and the text after
-            parts = current_text.split(image_markdown, 1)
-            
-            if parts[0]:
-                result.append(TextNode(parts[0],TextType.TEXT))
-            
-            result.append(TextNode(alt_text,TextType.IMAGE, url))
-            
-            # Update current_text to be whatever remains after the image
-            if len(parts) > 1:
-                current_text = parts[1]
-            else:
-                current_text = ""
-                
-        # Don't forget to add any remaining text after processing all images
-        if current_text:
-            result.append(TextNode(current_text, TextType.TEXT))
+        elif position < end:
+            # Don't forget to add any remaining text after the last match
+            result.append(TextNode.span(source, position, end, TextType.TEXT))
     
     return result
 
+def split_nodes_image(old_nodes):
+    return split_nodes_matches(old_nodes, LinkScanner.iter_images, TextType.IMAGE)
+
 def split_nodes_link(old_nodes):
-    result = []
-    #grabs nodes within old_nodes list one by one
-    for node in old_nodes:
-        #chekcs if nodes text_type is not TEXT if so will simply append the result and continue to next iteration (node)
-        if node.text_type != TextType.TEXT:
-            result.append(node)
-            continue
-        
-        links = extract_markdown_links(node.text)
-        
-        if not links:
-            result.append(node)
-            continue
-            
-        current_text = node.text
-        
-        for link_text, url, in links:
-            # The full markdown for this image looks like: ![alt_text](url)
-            link_markdown = f"[{link_text}]({url})"
-            
-            # Split the current_text at the image markdown
-            # This gives us the text before the image and the text after
-            parts = current_text.split(link_markdown, 1)
-            
-            if parts[0]:
-                result.append(TextNode(parts[0],TextType.TEXT))
-            
-            result.append(TextNode(link_text,TextType.LINK, url))
-            
-            # Update current_text to be whatever remains after the image
-            if len(parts) > 1:
-                current_text = parts[1]
-            else:
-                current_text = ""
-                
-        # Don't forget to add any remaining text after processing all images
-        if current_text:
-            result.append(TextNode(current_text, TextType.TEXT)) 
-    
-    return result
+    return split_nodes_matches(old_nodes, LinkScanner.iter_links, TextType.LINK)
+
+# anything that could start inline markup, text without any of these is plain text
+INLINE_MARKER_PATTERN = re.compile(r"[*_`\[!]")
+DELIMITER_TYPES = {"**": TextType.BOLD, "_": TextType.ITALIC, "`": TextType.CODE}
 
 #combining function time classless again CHAMP
 def text_to_textnodes(text):
-    #single text node defined with text value
-    nodes = [TextNode(text, TextType.TEXT)]
+    # single left-to-right scan that emits the final nodes directly, instead of
+    # running split_nodes_delimiter three times and then the image and link splits
     
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    # fast path: nothing in here can be markup
+    if INLINE_MARKER_PATTERN.search(text) is None:
+        return [TextNode(text, TextType.TEXT)] if text else []
     
-    #calling existing node image and node line split function
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    nodes = []
+    plain_start = 0  # where the plain text we haven't emitted yet begins
+    position = 0
+    next_image_start = -1  # images win over links, so a link can't run into the next image
+    # every link and image needs a "](", without one a [ or ! is always just text
+    scanner = LinkScanner(text) if "](" in text else None
+    while True:
+        marker = INLINE_MARKER_PATTERN.search(text, position)
+        if marker is None:
+            break
+        index = marker.start()
+        char = text[index]
+        
+        if char == "*" and not text.startswith("**", index):
+            # a lone * isn't markup
+            position = index + 1
+            continue
+        
+        if char == "!" or char == "[":
+            # images and links are matched in place, a [ or ! that doesn't start one is just text
+            if scanner is None:
+                position = index + 1
+                continue
+            if char == "!":
+                match = scanner.image_at(index)
+            else:
+                if next_image_start < index:
+                    image = scanner.find_image(index)
+                    next_image_start = image[0] if image else len(text)
+                match = scanner.link_at(index, next_image_start)
+            if match is None:
+                position = index + 1
+                continue
+            if index > plain_start:
+                nodes.append(TextNode.span(text, plain_start, index, TextType.TEXT))
+            start, match_end, text_start, text_end, url_start, url_end = match
+            text_type = TextType.IMAGE if char == "!" else TextType.LINK
+            nodes.append(TextNode.span(text, text_start, text_end, text_type, text[url_start:url_end]))
+            position = plain_start = match_end
+            continue
+        
+        # **bold**, _italic_ or `code`, the inside is taken as-is
+        delimiter = "**" if char == "*" else char
+        end_index = text.find(delimiter, index + len(delimiter))
+        if end_index == -1:
+            raise Exception(f"No matching delimiter found for {delimiter}")
+        if index > plain_start:
+            nodes.append(TextNode.span(text, plain_start, index, TextType.TEXT))
+        if end_index > index + len(delimiter):
+            nodes.append(TextNode.span(text, index + len(delimiter), end_index, DELIMITER_TYPES[delimiter]))
+        position = plain_start = end_index + len(delimiter)
     
+    # whatever is left after the last piece of markup
+    if plain_start < len(text):
+        nodes.append(TextNode.span(text, plain_start, len(text), TextType.TEXT))
     return nodes
 
 
@@ -259,25 +309,19 @@ def handle_code_block(block):
     
     return pre_node
 
-def text_to_children(text):
-    # Convert the text to a TextNode
-    text_node = TextNode(text, TextType.TEXT)
-    
-    # Split the node to process inline markdown
-    inline_nodes = split_nodes_delimiter([text_node], "**", TextType.BOLD)
-    
-    inline_nodes = split_nodes_delimiter(inline_nodes, "_", TextType.ITALIC)
-        
-    inline_nodes = split_nodes_delimiter(inline_nodes, "`", TextType.CODE)
-        
-    inline_nodes = split_nodes_link(inline_nodes)
-    inline_nodes = split_nodes_image(inline_nodes)
-    # Add other delimiters if needed
+def text_to_children(text, basepath="/", refs=None):
+    # Split the text into inline nodes (bold, italic, code, links, images) in one pass
+    # with a refs set, the site paths links and images point at are added to it
+    inline_nodes = text_to_textnodes(text)
     
     # Convert each TextNode to HTMLNode
     html_nodes = []
     for node in inline_nodes:
-        html_node = text_node_to_html_node(node)
+        if refs is not None and node.url is not None:
+            ref = local_ref(node.url)
+            if ref is not None:
+                refs.add(ref)
+        html_node = text_node_to_html_node(node, basepath)
         html_nodes.append(html_node)
     
     return html_nodes
@@ -312,88 +356,123 @@ def parse_quote_block(markdown_text):
 
     return root_node
 
-def markdown_to_html_node(markdown):
-    blocked_markdown = markdown_to_blocks(markdown)
+def block_to_html_node(block, block_type, basepath="/", lines=None, refs=None):
+    # builds the html node for one block, None if the block turns out to be empty
+    # lines are the block's lines as classify_block already split them
+    if lines is None:
+        lines = block.split('\n')
     child_node = None
-    parent_node = ParentNode("div", [])
     
- 
+    match block_type:
+        # Check if this block is actually a list (even if block_to_block_type doesn't recognize it)
+        
+        case BlockType.PARAGRAPH:
+             # For paragraphs, join all lines with spaces and remove extra whitespace
+            paragraph_text = ' '.join([line.strip() for line in lines if line.strip()])
+        
+            # Process inline markdown (bold, italic, code) within the paragraph text
+            children = text_to_children(paragraph_text, basepath, refs)
+        
+            # Create paragraph node with the processed children
+            child_node = ParentNode("p", children)
+    
+        case BlockType.HEADING:
+            heading_level = 0
+            for char in block:
+                if char == '#':
+                    heading_level += 1
+                else:
+                    break
+            text_content = block[heading_level:].strip()
+        
+            # Create appropriate h1-h6 node
+            child_node = ParentNode(f"h{heading_level}", text_to_children(text_content, basepath, refs))
+    
+        case BlockType.CODE:
+            if block_type == BlockType.CODE:
+                child_node = handle_code_block(block)
+    
+        case BlockType.UNORDERED_LIST:
+                # Create ul node with li children
+                li_nodes = []
+                for item in lines:
+                    if item.strip():  # Skip empty lines
+                        # Strip the '* ' or '- ' prefix
+                        if item.strip().startswith('* '):
+                            item_text = item.strip()[2:]
+                            li_nodes.append(ParentNode("li", text_to_children(item_text, basepath, refs)))
+                        elif item.strip().startswith('- '):
+                            item_text = item.strip()[2:]
+                            li_nodes.append(ParentNode("li", text_to_children(item_text, basepath, refs)))
+                if li_nodes:  # Only add if we have list items
+                    child_node = ParentNode("ul", li_nodes)
+    
+        case BlockType.ORDERED_LIST:
+            # Create ol node with li children
+            li_nodes = []
+            for item in lines:
+                if item.strip():  # Skip empty lines
+                    # Find the period after the number
+                    text_content = item[item.find('.')+1:].strip()
+                    li_nodes.append(ParentNode("li", text_to_children(text_content, basepath, refs)))
+            child_node = ParentNode("ol", li_nodes)
+    
+        case BlockType.QUOTE:
+            # Strip leading '>' from each line and join them into a single block
+            stripped_content = " ".join(line.lstrip("> ") for line in lines)
+            
+            # Use text_to_children to parse inline markdown within the quote
+            child_node = ParentNode("blockquote", text_to_children(stripped_content, basepath, refs))
     
-    #processes each block in markdown    
-    for block in blocked_markdown:
+    return child_node
+
+def iter_html_blocks(source, basepath="/", metrics=NULL_METRICS, refs=None):
+    # one html node per markdown block, source is a str, file object or mmap (see iter_lines)
+    # refs collects the site paths the page links to, see text_to_children
+    blocks = iter_blocks(source)
+    while True:
+        with metrics.stage("block_split"):
+            block = next(blocks, None)
+        if block is None:
+            return
+        metrics.count("blocks")
+        
         if not block.strip():  # Skip completely empty blocks
             continue
         
         #determines what type of block we are dealing with and sets said value to block)type
-        block_type = block_to_block_type(block)
-        child_node = None #reset child node at the start of each iteration (but after the skip 'if not' above)
+        with metrics.stage("classify"):
+            block_type, lines = classify_block(block)
+        
+        # turning the block into nodes is mostly inline markdown parsing
+        with metrics.stage("inline_parse"):
+            child_node = block_to_html_node(block, block_type, basepath, lines, refs)
         
-             
-        match block_type:
-            # Check if this block is actually a list (even if block_to_block_type doesn't recognize it)
-                
-            case BlockType.PARAGRAPH:
-                 # For paragraphs, join all lines with spaces and remove extra whitespace
-                paragraph_text = ' '.join([line.strip() for line in block.split('\n') if line.strip()])
-                
-                # Process inline markdown (bold, italic, code) within the paragraph text
-                children = text_to_children(paragraph_text)
-                
-                # Create paragraph node with the processed children
-                child_node = ParentNode("p", children)
-            
-            case BlockType.HEADING:
-                heading_level = 0
-                for char in block:
-                    if char == '#':
-                        heading_level += 1
-                    else:
-                        break
-                text_content = block[heading_level:].strip()
-                
-                # Create appropriate h1-h6 node
-                child_node = ParentNode(f"h{heading_level}", text_to_children(text_content))
-            
-            case BlockType.CODE:
-                if block_type == BlockType.CODE:
-                    child_node = handle_code_block(block)
-            
-            case BlockType.UNORDERED_LIST:
-                    # Create ul node with li children
-                    li_nodes = []
-                    for item in block.split('\n'):
-                        if item.strip():  # Skip empty lines
-                            # Strip the '* ' or '- ' prefix
-                            if item.strip().startswith('* '):
-                                item_text = item.strip()[2:]
-                                li_nodes.append(ParentNode("li", text_to_children(item_text)))
-                            elif item.strip().startswith('- '):
-                                item_text = item.strip()[2:]
-                                li_nodes.append(ParentNode("li", text_to_children(item_text)))
-                    if li_nodes:  # Only add if we have list items
-                        child_node = ParentNode("ul", li_nodes)
-            
-            case BlockType.ORDERED_LIST:
-                # Create ol node with li children
-                li_nodes = []
-                for item in block.split('\n'):
-                    if item.strip():  # Skip empty lines
-                        # Find the period after the number
-                        text_content = item[item.find('.')+1:].strip()
-                        li_nodes.append(ParentNode("li", text_to_children(text_content)))
-                child_node = ParentNode("ol", li_nodes)
-            
-            case BlockType.QUOTE:
-                # Strip leading '>' from each line and join them into a single block
-                stripped_content = " ".join(line.lstrip("> ") for line in block.split("\n"))
-                    
-                # Use text_to_children to parse inline markdown within the quote
-                child_node = ParentNode("blockquote", text_to_children(stripped_content))
-                
         if child_node:
-            parent_node.children.append(child_node)
-    
-    return parent_node
+            yield child_node
+
+def markdown_to_html_node(markdown, basepath="/", metrics=NULL_METRICS, refs=None):
+    return ParentNode("div", list(iter_html_blocks(markdown, basepath, metrics, refs)))
+
+class MarkdownContent:
+    """
+    The rendered <div> of a page that never exists as a whole tree: write_html parses
+    a block, writes it out and lets it go before reading the next one. Can only be
+    written once since it consumes its source.
+    """
+
+    def __init__(self, source, basepath="/", metrics=NULL_METRICS, refs=None):
+        self.source = source
+        self.basepath = basepath
+        self.metrics = metrics
+        self.refs = refs
+
+    def write_html(self, stream, minify=False):
+        stream.write("<div>")
+        for node in iter_html_blocks(self.source, self.basepath, self.metrics, self.refs):
+            node.write_html(stream, minify)
+        stream.write("</div>")
+
 tempstring = """"
 def generate_page(from_path, template_path, dest_path, basepath):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
@@ -426,35 +505,118 @@ def generate_page(from_path, template_path, dest_path, basepath):
     # Print a success message for confirmation
     print(f"Page successfully generated at {dest_path}")
     """
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+def read_cached_page(source_file, source_name, source_hash, basepath, page_metrics, ast_cache, refs):
+    # front matter, title and content node of a page, from the AST cache when its markdown
+    # was parsed before, otherwise parsed (with basepath "/") and stored for next time
+    with page_metrics.stage("read"):
+        entry = ast_cache.load(source_hash)
+        if entry is not None:
+            metadata, title, tree, page_refs = entry
+            page_metrics.count("ast_cache_hits")
+            logger.debug("Reusing cached parse of %s", source_name)
+            refs.update(page_refs)
+            return metadata, title, node_from_data(tree, basepath)
+        metadata, md_file = extract_metadata(source_file.read())
     
-    # Read the markdown file
-    with open(from_path, 'r') as opened_file:
-        md_file = opened_file.read()
+    with page_metrics.stage("block_split"):
+        title = extract_title(md_file)
+    page_refs = set()
+    node = markdown_to_html_node(md_file, "/", page_metrics, page_refs)
+    refs.update(page_refs)
+    tree = node_to_data(node)
+    ast_cache.store(source_hash, metadata, title, tree, sorted(page_refs))
+    if basepath != "/":
+        node = node_from_data(tree, basepath)
+    return metadata, title, node
 
-    # Read the HTML template
-    with open(template_path, 'r') as open_template:
-        tp_file = open_template.read()
+def page_slots(source_file, source_name, source_size, basepath, page_metrics=NULL_METRICS, ast_cache=None,
+               source_hash=None, refs=None):
+    # the template slots of one open markdown file: its front matter, Title and Content
+    # source_hash is needed when the page goes through the ast_cache
+    page_metrics.count("bytes_in", source_size)
+    if ast_cache is not None and source_size <= ast_cache.max_source_bytes:
+        metadata, new_title, content = read_cached_page(source_file, source_name, source_hash, basepath,
+                                                        page_metrics, ast_cache, set() if refs is None else refs)
+    else:
+        # a cheap first pass for the front matter and the title, neither needs the page in memory
+        with page_metrics.stage("read"):
+            metadata, header_length = split_front_matter(iter_lines(source_file))
+            source_file.seek(0)
+            new_title = extract_title(islice(iter_lines(source_file), header_length, None))
+            source_file.seek(0)
+        # the content renders block by block straight into the file as it reads the source
+        content = MarkdownContent(islice(iter_lines(source_file), header_length, None), basepath,
+                                  page_metrics, refs)
     
-    # Convert markdown to HTML and extract the title
-    html_md = markdown_to_html_node(md_file)
-    new_title = extract_title(md_file)
-    
-    # Replace placeholders for Title and Content
-    updated_content = tp_file.replace("{{ Title }}", new_title).replace("{{ Content }}", html_md.to_html())
-    
-    # Adjust paths for `basepath` to handle `href` and `src` attributes dynamically
-    final_output = updated_content.replace('href="/', f'href="{basepath}') \
-                                  .replace('src="/', f'src="{basepath}')
+    # the content slot gets a node, it's serialized straight into the file
+    slots = dict(metadata)
+    slots["Title"] = new_title
+    slots["Content"] = content
+    return slots
+
+def serialize_page(stream, template, slots, metrics=None):
+    # fills the template into stream, with metrics whatever the parse stages (and the
+    # stream itself) didn't book themselves is booked under serialize
+    if metrics is None:
+        template.write(stream, slots)
+        return
+    start = time.perf_counter()
+    timed_before = metrics.total()
+    template.write(stream, slots)
+    elapsed = time.perf_counter() - start
+    metrics.add("serialize", elapsed - (metrics.total() - timed_before))
+
+def write_page(stream, template, slots, metrics=None):
+    # serializes the page into stream, with metrics the writes are booked under write
+    serialize_page(stream if metrics is None else MetricsWriter(stream, metrics), template, slots, metrics)
+
+def render_page_html(source_file, source_name, source_size, template, basepath, metrics=None, ast_cache=None,
+                     source_hash=None, refs=None):
+    # the finished page as a string, for callers that write it somewhere else later (or never)
+    # with metrics the whole serialization is booked under serialize, there's no write here
+    page_metrics = NULL_METRICS if metrics is None else metrics
+    slots = page_slots(source_file, source_name, source_size, basepath, page_metrics, ast_cache, source_hash, refs)
+    stream = io.StringIO()
+    serialize_page(stream, template, slots, metrics)
+    return stream.getvalue()
+
+def generate_page(from_path, template_path, dest_path, basepath, metrics=None, ast_cache=None, source_hash=None,
+                  refs=None):
+    # template_path can also be an already compiled Template, which is what full builds pass
+    # (compiled for the same basepath, the template's own links are resolved at compile time)
+    # with metrics (a PageMetrics) each stage gets timed, and the metrics are returned
+    # with an ASTCache, pages up to its max_source_bytes are parsed once per content hash
+    # (source_hash, computed when not given) and taken from the cache after that
+    # with a refs set, the site paths the page's links and images point at are added to it
+    if isinstance(template_path, Template):
+        template = template_path
+    else:
+        template = load_template(template_path, basepath)
+    page_metrics = NULL_METRICS if metrics is None else metrics
+    logger.debug("Generating page from %s to %s", from_path, dest_path)
     
-    # Ensure the destination directory exists
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    source_size = os.path.getsize(from_path)
+    if ast_cache is not None and source_hash is None and source_size <= ast_cache.max_source_bytes:
+        source_hash = hash_file(from_path)
+    with open(from_path, 'r') as source_file:
+        slots = page_slots(source_file, from_path, source_size, basepath, page_metrics, ast_cache, source_hash,
+                           refs)
+        
+        # Ensure the destination directory exists
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
 
-    # Write the final updated content to the destination file
-    with open(dest_path, 'w') as dest_file:
-        dest_file.write(final_output)
+        # Stream the page into a temp file next to the destination, links already carry the basepath
+        # (parsing happens inside the write too when the content is streamed, so a page that fails
+        # to parse halfway must never land on dest_path: the previous output stays until this one is done)
+        temp_path = f"{dest_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w') as dest_file:
+                write_page(dest_file, template, slots, metrics)
+            os.replace(temp_path, dest_path)
+        except BaseException:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            raise
     
-    # Print a success message confirming the generation
-    print(f"Page successfully generated at {dest_path}")
-    
\ No newline at end of file
+    logger.debug("Page successfully generated at %s", dest_path)
+    return metrics
@@ -0,0 +1,169 @@
+import logging, os, time
+from build import *
+from assets import *
+from compress import *
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(root, suffix=None):
+    # path -> (mtime_ns, size) for every file under root, optionally only one extension
+    files = {}
+    for rel_path, entry in walk_files(root, suffix, missing_ok=True):
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            # deleted between listing and stat, the next poll will see it as removed
+            continue
+        files[os.path.join(root, rel_path)] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def diff_snapshots(old, new):
+    changed = sorted(path for path, signature in new.items() if old.get(path) != signature)
+    removed = sorted(set(old) - set(new))
+    return changed, removed
+
+
+class SiteWatcher:
+    """
+    Keeps a build alive between edits.
+
+    After one normal build it polls content/, static/ and the template, and only
+    redoes the work an edit actually affects: a changed page is re-rendered on its
+    own, a changed asset is copied on its own along with re-rendering the pages that
+    link to it, and only a template change re-renders everything. The compiled
+    template and the manifest stay in memory the whole time.
+    """
+
+    def __init__(self, content_dir, static_dir, template_path, public_dir, basepath, manifest, jobs=1,
+                 ast_cache=None, publish=DEFAULT_PUBLISH, gzip_level=None, minify=False, use_hash=False, force=False):
+        self.content_dir = content_dir
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.public_dir = public_dir
+        self.basepath = basepath
+        self.manifest = manifest
+        self.jobs = jobs
+        self.ast_cache = ast_cache
+        self.publish = publish
+        self.gzip_level = gzip_level
+        self.minify = minify
+        # --checksum for every sync, --force only for the initial build
+        self.use_hash = use_hash
+        self.force = force
+        self.pages = {}
+        self.assets = {}
+        self.template_stat = None
+
+    def build(self):
+        # the initial full (incremental) build, then remember what everything looked like
+        # pages that fail to render are logged and retried on their next save, like in poll
+        report = sync_static(self.static_dir, self.public_dir, self.manifest, self.use_hash, self.publish)
+        build_pages(self.content_dir, self.template_path, self.public_dir, self.basepath, self.manifest,
+                    self.force, self.jobs, ast_cache=self.ast_cache,
+                    changed_assets=report["copied"] + report["removed"], minify=self.minify, keep_going=True)
+        self.update_sidecars()
+        self.manifest.save()
+        self.pages = snapshot(self.content_dir, ".md")
+        self.assets = snapshot(self.static_dir)
+        self.template_stat = self.stat_template()
+
+    def stat_template(self):
+        stat = os.stat(self.template_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def poll(self):
+        # checks for changes once, returns how many pages and assets were redone
+        rebuilt_pages = 0
+        synced_assets = 0
+
+        template_stat = self.stat_template()
+        if template_stat != self.template_stat:
+            self.template_stat = template_stat
+            if template_key(self.template_path, self.minify) != self.manifest.template_hash:
+                # every page embeds the template, nothing for it but to redo them all
+                logger.info("Template changed, re-rendering every page")
+                failed = build_pages(self.content_dir, self.template_path, self.public_dir, self.basepath,
+                                     self.manifest, jobs=self.jobs, ast_cache=self.ast_cache, minify=self.minify,
+                                     keep_going=True)
+                self.pages = snapshot(self.content_dir, ".md")
+                rebuilt_pages = len(self.pages) - len(failed)
+
+        # assets first, so pages using one that changed are re-rendered along with the edited ones
+        dependents = []
+        assets = snapshot(self.static_dir)
+        changed, removed = diff_snapshots(self.assets, assets)
+        self.assets = assets
+        if changed or removed:
+            report = sync_paths(
+                self.static_dir, self.public_dir, self.manifest,
+                [os.path.relpath(path, self.static_dir) for path in changed],
+                [os.path.relpath(path, self.static_dir) for path in removed],
+                self.use_hash, self.publish,
+            )
+            synced_assets = len(report["copied"]) + len(report["removed"])
+            dependents = self.manifest.pages_using(report["copied"] + report["removed"])
+
+        pages = snapshot(self.content_dir, ".md")
+        changed, removed = diff_snapshots(self.pages, pages)
+        self.pages = pages
+        rebuilt_pages += self.rebuild_pages(changed, removed, dependents)
+
+        if rebuilt_pages or synced_assets:
+            self.update_sidecars()
+            self.manifest.save()
+        return rebuilt_pages, synced_assets
+
+    def update_sidecars(self):
+        # only outputs rewritten since the last time get compressed again
+        if self.gzip_level is None:
+            remove_sidecars(self.public_dir, self.manifest)
+        else:
+            compress_outputs(self.public_dir, self.manifest, self.gzip_level)
+
+    def rebuild_pages(self, changed, removed, dependents=()):
+        # dependents are re-rendered even when their markdown is unchanged, they use a changed static file
+        if not changed and not removed and not dependents:
+            return 0
+        template = load_template(self.template_path, self.basepath, self.minify)
+        rebuilt = 0
+        for source_path in sorted(set(changed).union(dependents)):
+            dest_path = page_dest_path(source_path, self.content_dir, self.public_dir)
+            try:
+                source_hash = hash_file(source_path)
+            except FileNotFoundError:
+                # a dependent that was deleted meanwhile, the next poll removes it
+                continue
+            if source_path not in dependents and self.manifest.is_fresh(source_path, source_hash, dest_path):
+                # saved without changes
+                continue
+            try:
+                result, refs = render_page(source_path, template, dest_path, self.basepath,
+                                           ast_cache=self.ast_cache, source_hash=source_hash)
+            except Exception as error:
+                # a half-typed page shouldn't kill the watcher, it gets retried on the next save
+                logger.error(f"Failed to render {source_path}: {error}")
+                continue
+            self.manifest.record(source_path, source_hash, dest_path, refs)
+            rebuilt += 1
+        for source_path in removed:
+            dest_path = self.manifest.remove_page(source_path, self.public_dir)
+            if dest_path is not None:
+                logger.info("Removed page with deleted source: %s", dest_path)
+                rebuilt += 1
+        return rebuilt
+
+    def run(self, interval=0.5):
+        self.build()
+        logger.info(f"Watching {self.content_dir}, {self.static_dir} and {self.template_path} for changes...")
+        try:
+            while True:
+                time.sleep(interval)
+                start = time.perf_counter()
+                rebuilt_pages, synced_assets = self.poll()
+                if rebuilt_pages or synced_assets:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    logger.info(f"Rebuilt {rebuilt_pages} page(s), synced {synced_assets} asset(s) in {elapsed_ms:.1f} ms")
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")